@@ -1,33 +1,40 @@
 """Точка входа графического интерфейса Arduino RoboLab."""
 from __future__ import annotations
 
+import logging
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from PySide6 import __version__ as PYSIDE_VERSION
-from PySide6.QtWidgets import QApplication
-
-
-# Убедимся, что корень проекта в sys.path для локального запуска
 PROJECT_ROOT = Path(__file__).resolve().parent
-if str(PROJECT_ROOT.parent) not in sys.path:
-    sys.path.append(str(PROJECT_ROOT.parent))
+
+log = logging.getLogger(__name__)
 
 
 def main() -> int:
     """Запустить предварительную версию GUI."""
-    app = QApplication(sys.argv)
+    from app.core.blocks_loader import load_blocks
 
     blocks_path = PROJECT_ROOT.parent / "data" / "blocks" / "blocks.json"
-    print(f"[RoboLab] PySide6 version: {PYSIDE_VERSION}")
-    print(f"[RoboLab] Blocks catalog: {blocks_path}")
+    log.debug("Blocks catalog: %s", blocks_path)
+
+    # Каталог блоков читается в фоне, пока импортируется Qt и строится окно
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="robolab-load") as executor:
+        blocks_future = executor.submit(load_blocks, blocks_path)
+
+        from PySide6.QtWidgets import QApplication
+
+        app = QApplication(sys.argv)
 
-    from app.ui.main_window import MainWindow
+        from app.ui.main_window import MainWindow
 
-    window = MainWindow()
+        window = MainWindow(blocks_future=blocks_future)
     window.show()
     return app.exec()
 
 
 if __name__ == "__main__":
+    # Убедимся, что корень проекта в sys.path для локального запуска
+    if str(PROJECT_ROOT.parent) not in sys.path:
+        sys.path.append(str(PROJECT_ROOT.parent))
     sys.exit(main())
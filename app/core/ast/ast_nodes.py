@@ -1,13 +1,15 @@
 """Модель AST визуальных блоков Arduino RoboLab."""
 from __future__ import annotations
 
+import sys
+from array import array
 from dataclasses import dataclass, field
 from enum import Enum
+from itertools import chain
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Mapping, MutableMapping, Optional
-
-import json
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
 
+from app.core import jsonio
 from app.core.blocks_loader import BlocksLoaderError, load_blocks
 
 
@@ -22,13 +24,16 @@ class Section(Enum):
 
     @classmethod
     def from_string(cls, value: str) -> "Section":
-        try:
-            return cls(value)
-        except ValueError as exc:
-            raise ValueError(f"Неизвестный раздел секции: {value}") from exc
+        section = _SECTION_BY_VALUE.get(value)
+        if section is None:
+            raise ValueError(f"Неизвестный раздел секции: {value}")
+        return section
+
+
+_SECTION_BY_VALUE: Dict[str, Section] = {section.value: section for section in Section}
 
 
-@dataclass(frozen=True)
+@dataclass(slots=True)
 class BlockParameter:
     """Описание параметра блока."""
 
@@ -37,7 +42,7 @@ class BlockParameter:
     default: object | None = None
 
 
-@dataclass(frozen=True)
+@dataclass(slots=True)
 class BlockContainerSpec:
     """Описание контейнера блока (для дочерних блоков)."""
 
@@ -46,7 +51,7 @@ class BlockContainerSpec:
     placeholder: Optional[str] = None
 
 
-@dataclass(frozen=True)
+@dataclass(slots=True)
 class BlockDefinition:
     """Метаданные блока, загружаемые из JSON."""
 
@@ -57,50 +62,67 @@ class BlockDefinition:
     section: Optional[Section]
     template: Optional[str]
     returns: Optional[str]
-    parameters: List[BlockParameter] = field(default_factory=list)
-    setup_snippets: List[str] = field(default_factory=list)
-    globals_snippets: List[str] = field(default_factory=list)
-    includes: List[str] = field(default_factory=list)
-    functions_snippets: List[str] = field(default_factory=list)
-    containers: List[BlockContainerSpec] = field(default_factory=list)
+    parameters: Sequence[BlockParameter] = ()
+    setup_snippets: Sequence[str] = ()
+    globals_snippets: Sequence[str] = ()
+    includes: Sequence[str] = ()
+    functions_snippets: Sequence[str] = ()
+    containers: Sequence[BlockContainerSpec] = ()
+    _is_expression: bool = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self._is_expression = self.kind == "expression"
 
     @property
     def is_expression(self) -> bool:
-        return self.kind == "expression"
+        return self._is_expression
 
 
-@dataclass
+@dataclass(slots=True)
 class BlockInstance:
     """Конкретный блок на канве с параметрами и дочерними блоками."""
 
     instance_id: str
     definition_id: str
-    values: MutableMapping[str, object] = field(default_factory=dict)
-    children: MutableMapping[str, List["BlockInstance"]] = field(default_factory=dict)
+    values: Dict[str, object] = field(default_factory=dict)
+    # Контейнеры хранятся обычным dict (порядок вставки = порядок обхода)
+    children: Dict[str, List["BlockInstance"]] = field(default_factory=dict)
 
     def iter_children(self) -> Iterable["BlockInstance"]:
+        return chain.from_iterable(self.children.values())
+
+    def foreach_child(self, fn: Callable[["BlockInstance"], None]) -> None:
+        """Вызвать ``fn`` для каждого дочернего блока без промежуточных списков."""
+
         for blocks in self.children.values():
             for block in blocks:
-                yield block
+                fn(block)
 
 
-@dataclass
+@dataclass(slots=True)
 class ProgramNode:
     """AST всей программы (проект)."""
 
     board_id: str
     root: Optional[BlockInstance] = None
-    metadata: MutableMapping[str, object] = field(default_factory=dict)
+    metadata: Dict[str, object] = field(default_factory=dict)
 
     def iter_blocks(self) -> Iterable[BlockInstance]:
+        """Обход блоков в прямом порядке."""
+
         if not self.root:
-            return []
+            return iter(())
+        return self._walk_blocks()
 
+    def _walk_blocks(self) -> Iterator[BlockInstance]:
         stack = [self.root]
+        push = stack.extend
         while stack:
             block = stack.pop()
             yield block
-            stack.extend(reversed(list(block.iter_children())))
+            # Дочерние блоки кладём в обратном порядке, не собирая их в общий список
+            for blocks in reversed(block.children.values()):
+                push(reversed(blocks))
 
 
 class BlockRegistry:
@@ -109,15 +131,26 @@ class BlockRegistry:
     def __init__(self, definitions: Mapping[str, BlockDefinition], categories: Mapping[str, Mapping[str, str]]):
         self._definitions = dict(definitions)
         self.categories = dict(categories)
+        # Сырые описания блоков, которые ещё не превращены в BlockDefinition
+        self._raw: Dict[str, Mapping[str, Any]] = {}
+        # Пул одинаковых фрагментов кода (#include, setup и т.п.) разных блоков
+        self._snippet_pool: Dict[str, str] = {}
 
     def get(self, block_id: str) -> BlockDefinition:
-        try:
-            return self._definitions[block_id]
-        except KeyError as exc:
-            raise KeyError(f"Неизвестный блок '{block_id}'") from exc
+        definition = self._definitions.get(block_id)
+        if definition is not None:
+            return definition
+        raw = self._raw.get(block_id)
+        if raw is None:
+            raise KeyError(f"Неизвестный блок '{block_id}'")
+        definition = _definition_from_mapping(raw, self._snippet_pool)
+        self._definitions[block_id] = definition
+        return definition
 
     @classmethod
     def load_from_file(cls, path: Path) -> "BlockRegistry":
+        """Загрузить реестр из JSON; определения разбираются при первом :meth:`get`."""
+
         normalized = load_blocks(path)
         try:
             payload = normalized.require_registry_payload()
@@ -125,116 +158,166 @@ class BlockRegistry:
             raise BlocksLoaderError(
                 f"Не удалось получить определения блоков из {path}: {exc}"
             ) from exc
-        return cls.from_mapping(payload)
+        return cls.from_mapping_lazy(payload)
 
     @classmethod
     def from_mapping(cls, payload: Mapping[str, Any]) -> "BlockRegistry":
         definitions: Dict[str, BlockDefinition] = {}
         categories = payload.get("categories", {})
-        blocks_data = payload.get("blocks", [])
-        if not isinstance(blocks_data, Iterable):
-            raise BlocksLoaderError("Секция 'blocks' должна быть списком")
-
-        def _string_list(value: Any) -> List[str]:
-            if isinstance(value, str):
-                return [value]
-            if isinstance(value, Iterable):
-                return [str(item) for item in value if isinstance(item, str)]
-            return []
-
-        for block_data in blocks_data:
-            if not isinstance(block_data, Mapping):
-                continue
-            try:
-                block_id = str(block_data["id"])
-                name = str(block_data["name"])
-                category = str(block_data["category"])
-                kind = str(block_data["kind"])
-            except KeyError as exc:
-                raise BlocksLoaderError(
-                    "Определение блока отсутствует или содержит неполные данные"
-                ) from exc
-
-            containers = []
-            for item in block_data.get("containers", []):
-                if not isinstance(item, Mapping):
-                    continue
-                try:
-                    container_name = str(item["name"])
-                    section = Section.from_string(str(item["section"]))
-                except (KeyError, ValueError) as exc:
-                    raise BlocksLoaderError(
-                        f"Некорректное описание контейнера блока {block_id}"
-                    ) from exc
-                placeholder = item.get("placeholder")
-                containers.append(
-                    BlockContainerSpec(
-                        name=container_name,
-                        section=section,
-                        placeholder=placeholder if isinstance(placeholder, str) else None,
-                    )
-                )
-
-            parameters: List[BlockParameter] = []
-            for param in block_data.get("parameters", []):
-                if not isinstance(param, Mapping):
-                    continue
-                try:
-                    param_name = str(param["name"])
-                    param_type = str(param["type"])
-                except KeyError as exc:
-                    raise BlocksLoaderError(
-                        f"Некорректное описание параметра блока {block_id}"
-                    ) from exc
-                parameters.append(
-                    BlockParameter(
-                        name=param_name,
-                        type=param_type,
-                        default=param.get("default"),
-                    )
-                )
-
-            section_value = block_data.get("section")
-            if isinstance(section_value, str) and section_value:
-                section = Section.from_string(section_value)
-            else:
-                section = None
-
-            definitions[block_id] = BlockDefinition(
-                block_id=block_id,
-                name=name,
-                category=category,
-                kind=kind,
-                section=section,
-                template=block_data.get("template"),
-                returns=block_data.get("returns"),
-                parameters=parameters,
-                setup_snippets=_string_list(block_data.get("setup", [])),
-                globals_snippets=_string_list(block_data.get("globals", [])),
-                includes=_string_list(block_data.get("includes", [])),
-                functions_snippets=_string_list(block_data.get("functions", [])),
-                containers=containers,
-            )
-
+        pool: Dict[str, str] = {}
+        for block_data in _iter_block_payloads(payload):
+            definition = _definition_from_mapping(block_data, pool)
+            definitions[definition.block_id] = definition
         return cls(definitions, categories)
 
+    @classmethod
+    def from_mapping_lazy(cls, payload: Mapping[str, Any]) -> "BlockRegistry":
+        """Создать реестр, откладывая разбор определений до первого :meth:`get`."""
+
+        registry = cls({}, payload.get("categories", {}))
+        raw = registry._raw
+        for block_data in _iter_block_payloads(payload):
+            raw[_check_block_payload(block_data)] = block_data
+        return registry
+
     def __contains__(self, block_id: str) -> bool:
-        return block_id in self._definitions
+        return block_id in self._definitions or block_id in self._raw
 
     def values(self) -> Iterable[BlockDefinition]:
+        if self._raw and len(self._definitions) < len(self._raw):
+            self._definitions = {block_id: self.get(block_id) for block_id in self._raw}
         return self._definitions.values()
 
 
-@dataclass
+def _iter_block_payloads(payload: Mapping[str, Any]) -> Iterable[Mapping[str, Any]]:
+    blocks_data = payload.get("blocks", [])
+    if not isinstance(blocks_data, (list, tuple)):
+        raise BlocksLoaderError("Секция 'blocks' должна быть списком")
+    return (block_data for block_data in blocks_data if isinstance(block_data, Mapping))
+
+
+def _string_list(value: Any, pool: Dict[str, str]) -> Sequence[str]:
+    """Нормализовать список фрагментов кода, переиспользуя одинаковые строки из ``pool``."""
+
+    if isinstance(value, str):
+        return (pool.setdefault(value, value),)
+    if isinstance(value, (list, tuple)) and value:
+        setdefault = pool.setdefault
+        return tuple(setdefault(item, item) for item in value if isinstance(item, str))
+    return ()
+
+
+# Повторяющиеся значения (категории, виды, типы) хранятся одним объектом строки
+_intern = sys.intern
+
+
+def _check_block_payload(block_data: Mapping[str, Any]) -> str:
+    """Проверить структуру описания блока, не создавая :class:`BlockDefinition`.
+
+    Бросает те же ошибки, что и :func:`_definition_from_mapping`, чтобы ленивый
+    реестр сообщал о некорректном каталоге при загрузке, а не при первом ``get``.
+    """
+
+    get = block_data.get
+    block_id = get("id")
+    if block_id is None or get("name") is None or get("category") is None or get("kind") is None:
+        raise BlocksLoaderError("Определение блока отсутствует или содержит неполные данные")
+    block_id = str(block_id)
+    for item in get("containers", []):
+        if isinstance(item, Mapping) and (
+            item.get("name") is None or str(item.get("section")) not in _SECTION_BY_VALUE
+        ):
+            raise BlocksLoaderError(f"Некорректное описание контейнера блока {block_id}")
+    for param in get("parameters", []):
+        if isinstance(param, Mapping) and (param.get("name") is None or param.get("type") is None):
+            raise BlocksLoaderError(f"Некорректное описание параметра блока {block_id}")
+    section_value = get("section")
+    if isinstance(section_value, str) and section_value and section_value not in _SECTION_BY_VALUE:
+        raise ValueError(f"Неизвестный раздел секции: {section_value}")
+    return block_id
+
+
+def _definition_from_mapping(block_data: Mapping[str, Any], pool: Dict[str, str]) -> BlockDefinition:
+    get = block_data.get
+    block_id = get("id")
+    name = get("name")
+    category = get("category")
+    kind = get("kind")
+    if block_id is None or name is None or category is None or kind is None:
+        raise BlocksLoaderError("Определение блока отсутствует или содержит неполные данные")
+    block_id = str(block_id)
+
+    containers = []
+    for item in get("containers", []):
+        if not isinstance(item, Mapping):
+            continue
+        container_name = item.get("name")
+        section = _SECTION_BY_VALUE.get(str(item.get("section")))
+        if container_name is None or section is None:
+            raise BlocksLoaderError(f"Некорректное описание контейнера блока {block_id}")
+        placeholder = item.get("placeholder")
+        containers.append(
+            BlockContainerSpec(
+                name=_intern(str(container_name)),
+                section=section,
+                placeholder=placeholder if isinstance(placeholder, str) else None,
+            )
+        )
+
+    parameters: List[BlockParameter] = []
+    for param in get("parameters", []):
+        if not isinstance(param, Mapping):
+            continue
+        param_name = param.get("name")
+        param_type = param.get("type")
+        if param_name is None or param_type is None:
+            raise BlocksLoaderError(f"Некорректное описание параметра блока {block_id}")
+        parameters.append(
+            BlockParameter(
+                name=str(param_name),
+                type=_intern(str(param_type)),
+                default=param.get("default"),
+            )
+        )
+
+    section_value = get("section")
+    if isinstance(section_value, str) and section_value:
+        section = _SECTION_BY_VALUE.get(section_value)
+        if section is None:
+            raise ValueError(f"Неизвестный раздел секции: {section_value}")
+    else:
+        section = None
+
+    return BlockDefinition(
+        block_id=block_id,
+        name=str(name),
+        category=_intern(str(category)),
+        kind=_intern(str(kind)),
+        section=section,
+        template=get("template"),
+        returns=get("returns"),
+        parameters=tuple(parameters) if parameters else (),
+        setup_snippets=_string_list(get("setup"), pool),
+        globals_snippets=_string_list(get("globals"), pool),
+        includes=_string_list(get("includes"), pool),
+        functions_snippets=_string_list(get("functions"), pool),
+        containers=tuple(containers) if containers else (),
+    )
+
+
+@dataclass(slots=True)
 class BoardPinCapabilities:
-    """Описание возможностей платы."""
+    """Описание возможностей платы.
+
+    Номера цифровых и ШИМ-выводов хранятся компактными массивами ``array("h")``.
+    """
 
-    digital: List[int]
-    pwm: List[int]
+    digital: Sequence[int]
+    pwm: Sequence[int]
     analog: List[str]
 
 
-@dataclass
+@dataclass(slots=True)
 class BoardProfile:
     """Описание платы (идентификатор и команды прошивки)."""
 
@@ -247,22 +330,52 @@ class BoardProfile:
     pins: BoardPinCapabilities
 
 
-def load_board_profiles(path: Path) -> Dict[str, BoardProfile]:
-    data = json.loads(Path(path).read_text(encoding="utf-8"))
-    profiles: Dict[str, BoardProfile] = {}
-    for board in data.get("boards", []):
-        pins = board.get("pins", {})
-        profiles[board["id"]] = BoardProfile(
-            board_id=board["id"],
-            name=board.get("name", board["id"]),
-            fqbn=board.get("fqbn", board["id"]),
-            upload_command=board.get("upload", {}).get("command", ""),
-            upload_tool=board.get("upload", {}).get("tool", ""),
-            upload_speed=board.get("upload", {}).get("speed", 115200),
-            pins=BoardPinCapabilities(
-                digital=[int(p) for p in pins.get("digital", [])],
-                pwm=[int(p) for p in pins.get("pwm", [])],
-                analog=[str(p) for p in pins.get("analog", [])],
-            ),
-        )
-    return profiles
+class BoardProfiles(Mapping[str, BoardProfile]):
+    """Профили плат, которые собираются из JSON по первому обращению."""
+
+    def __init__(self, boards: Mapping[str, Mapping[str, Any]]):
+        self._raw = dict(boards)
+        self._profiles: Dict[str, BoardProfile] = {}
+
+    def __getitem__(self, board_id: str) -> BoardProfile:
+        profile = self._profiles.get(board_id)
+        if profile is None:
+            profile = _board_profile_from_mapping(self._raw[board_id])
+            self._profiles[board_id] = profile
+        return profile
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._raw)
+
+    def __len__(self) -> int:
+        return len(self._raw)
+
+    def __contains__(self, board_id: object) -> bool:
+        return board_id in self._raw
+
+
+def _board_profile_from_mapping(board: Mapping[str, Any]) -> BoardProfile:
+    pins = board.get("pins", {})
+    try:
+        digital = array("h", [int(p) for p in pins.get("digital", [])])
+        pwm = array("h", [int(p) for p in pins.get("pwm", [])])
+    except OverflowError as exc:
+        raise BlocksLoaderError(f"Номер вывода платы {board['id']} вне допустимого диапазона: {exc}") from exc
+    return BoardProfile(
+        board_id=board["id"],
+        name=board.get("name", board["id"]),
+        fqbn=board.get("fqbn", board["id"]),
+        upload_command=board.get("upload", {}).get("command", ""),
+        upload_tool=board.get("upload", {}).get("tool", ""),
+        upload_speed=board.get("upload", {}).get("speed", 115200),
+        pins=BoardPinCapabilities(
+            digital=digital,
+            pwm=pwm,
+            analog=[str(p) for p in pins.get("analog", [])],
+        ),
+    )
+
+
+def load_board_profiles(path: Path) -> BoardProfiles:
+    data = jsonio.load_path(path)
+    return BoardProfiles({board["id"]: board for board in data.get("boards", [])})
@@ -1,18 +1,27 @@
 """Utilities for loading block metadata in different formats."""
 from __future__ import annotations
 
-import copy
-import json
+import sys
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Mapping, Optional
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from app.core import jsonio
+
+
+# Shared read-only result for blocks without ports (the common case).
+_EMPTY_PORTS: Mapping[str, Sequence["BlockPortSpec"]] = MappingProxyType({"inputs": (), "outputs": ()})
+
+# Low-cardinality strings (categories, sections, types) share one object each.
+_intern = sys.intern
 
 
 class BlocksLoaderError(RuntimeError):
     """Raised when block metadata cannot be loaded or normalised."""
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class BlockParamSpec:
     """Description of a block parameter."""
 
@@ -31,7 +40,7 @@ class BlockParamSpec:
         return payload
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class BlockPortSpec:
     """Description of a port that can be rendered in the palette."""
 
@@ -46,7 +55,7 @@ class BlockPortSpec:
         return payload
 
 
-@dataclass
+@dataclass(slots=True)
 class BlockSpec:
     """Normalised representation of a block definition."""
 
@@ -56,15 +65,25 @@ class BlockSpec:
     section: Optional[str] = None
     description: Optional[str] = None
     color: Optional[str] = None
-    params: List[BlockParamSpec] = field(default_factory=list)
-    ports: Dict[str, List[BlockPortSpec]] = field(default_factory=dict)
+    params: Sequence[BlockParamSpec] = ()
+    ports: Mapping[str, Sequence[BlockPortSpec]] = field(default_factory=dict)
     default_params: Dict[str, Any] = field(default_factory=dict)
-    aliases: List[str] = field(default_factory=list)
+    aliases: Sequence[str] = ()
     raw: Dict[str, Any] = field(default_factory=dict)
+    _palette_entry: Optional[Dict[str, Any]] = field(default=None, init=False, repr=False, compare=False)
 
     def to_palette_entry(self) -> Dict[str, Any]:
-        """Return a dictionary compatible with the canvas palette."""
+        """Return a dictionary compatible with the canvas palette.
 
+        The entry is built once and cached; callers get a shallow copy whose
+        nested values are shared and must be treated as read-only.
+        """
+
+        if self._palette_entry is None:
+            self._palette_entry = self._build_palette_entry()
+        return dict(self._palette_entry)
+
+    def _build_palette_entry(self) -> Dict[str, Any]:
         payload: Dict[str, Any] = dict(self.raw) if self.raw else {}
         payload.setdefault("id", self.identifier)
         payload.setdefault("category", self.category)
@@ -85,12 +104,15 @@ class BlockSpec:
         else:
             # Ensure ports dictionary has both keys even if source omitted them.
             ports_dict = payload.get("ports", {})
-            if not isinstance(ports_dict, dict):
-                ports_dict = {}
+            # Copy: the source dict belongs to the parsed catalog (raw is shared).
+            ports_dict = dict(ports_dict) if isinstance(ports_dict, dict) else {}
             for direction, ports in self.ports.items():
-                ports_dict.setdefault(direction, [port.to_dict() for port in ports])
-            ports_dict.setdefault("inputs", ports_dict.get("inputs", []))
-            ports_dict.setdefault("outputs", ports_dict.get("outputs", []))
+                if direction not in ports_dict:
+                    ports_dict[direction] = [port.to_dict() for port in ports]
+            if "inputs" not in ports_dict:
+                ports_dict["inputs"] = []
+            if "outputs" not in ports_dict:
+                ports_dict["outputs"] = []
             payload["ports"] = ports_dict
         if self.default_params and "default_params" not in payload:
             payload["default_params"] = dict(self.default_params)
@@ -99,7 +121,7 @@ class BlockSpec:
         return payload
 
 
-@dataclass
+@dataclass(slots=True)
 class NormalizedBlocks:
     """Container with block specifications and registry payload."""
 
@@ -118,66 +140,54 @@ class NormalizedBlocks:
             raise BlocksLoaderError(
                 "Файл blocks.json не содержит сведений, необходимых для генератора кода"
             )
-        return copy.deepcopy(self.registry_payload)
+        # The payload is plain JSON data, so a serialise/parse round-trip is a
+        # much cheaper deep copy than copy.deepcopy.
+        return jsonio.loads(jsonio.dumps(self.registry_payload))
 
 
 def load_blocks(path: str | Path) -> NormalizedBlocks:
-    """Load blocks metadata supporting both legacy (dict) and palette (list) formats."""
+    """Load blocks metadata supporting both legacy (dict) and palette (list) formats.
+
+    Results are memoised per file and reused while its mtime and size are
+    unchanged, so the returned object is shared and must not be mutated.
+    """
 
     file_path = Path(path)
     try:
-        payload = json.loads(file_path.read_text(encoding="utf-8"))
+        stat = file_path.stat()
+        cache_key = str(file_path.resolve())
+        cached = _LOAD_CACHE.get(cache_key)
+        if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+        payload = jsonio.load_path(file_path)
     except FileNotFoundError as exc:  # pragma: no cover - configuration issue
         raise BlocksLoaderError(f"Не найден файл {file_path}") from exc
-    except json.JSONDecodeError as exc:
+    except ValueError as exc:
+        # Both json.JSONDecodeError and orjson.JSONDecodeError subclass ValueError.
         raise BlocksLoaderError(f"Некорректный JSON в {file_path}: {exc}") from exc
 
     if isinstance(payload, list):
-        return _load_from_list(file_path, payload)
-    if isinstance(payload, Mapping):
-        return _load_from_mapping(file_path, payload)
-    raise BlocksLoaderError("Ожидался список или объект с блоками")
+        normalized = _load_from_list(file_path, payload)
+    elif isinstance(payload, Mapping):
+        normalized = _load_from_mapping(file_path, payload)
+    else:
+        raise BlocksLoaderError("Ожидался список или объект с блоками")
+    _LOAD_CACHE[cache_key] = (stat.st_mtime_ns, stat.st_size, normalized)
+    return normalized
 
 
-def _load_from_list(path: Path, payload: List[Any]) -> NormalizedBlocks:
-    blocks: List[BlockSpec] = []
-    alias_map: Dict[str, str] = {}
-    for entry in payload:
-        if not isinstance(entry, dict):
-            continue
-        identifier = str(entry.get("id", "")).strip()
-        category = str(entry.get("category", "")).strip()
-        if not identifier or not category:
-            continue
-        title = str(entry.get("title") or identifier)
-        section_value = entry.get("section")
-        section = str(section_value) if isinstance(section_value, str) else None
-        description = entry.get("description")
-        description = str(description) if isinstance(description, str) else None
-        color_value = entry.get("color")
-        color = str(color_value) if isinstance(color_value, str) else None
-        params = _parse_params(entry.get("params", []))
-        ports = _parse_ports(entry.get("ports", {}))
-        default_params = entry.get("default_params") if isinstance(entry.get("default_params"), dict) else {}
-        aliases = _parse_aliases(entry.get("aliases"))
-        for alias in aliases:
-            alias_map.setdefault(alias, identifier)
-        blocks.append(
-            BlockSpec(
-                identifier=identifier,
-                category=category,
-                title=title,
-                section=section,
-                description=description,
-                color=color,
-                params=params,
-                ports=ports,
-                default_params=dict(default_params),
-                aliases=aliases,
-                raw=dict(entry),
-            )
-        )
+def clear_load_cache() -> None:
+    """Forget every result memoised by :func:`load_blocks`."""
+
+    _LOAD_CACHE.clear()
+
+
+# Resolved path -> (st_mtime_ns, st_size, result); one entry per catalog file.
+_LOAD_CACHE: Dict[str, Tuple[int, int, NormalizedBlocks]] = {}
 
+
+def _load_from_list(path: Path, payload: List[Any]) -> NormalizedBlocks:
+    blocks, alias_map = _normalise_entries(payload, entry_type=dict, params_key="params")
     by_category = _group_by_category(blocks)
     registry_payload = _fallback_registry_payload()
     return NormalizedBlocks(
@@ -195,36 +205,76 @@ def _load_from_mapping(path: Path, payload: Mapping[str, Any]) -> NormalizedBloc
     if not isinstance(blocks_data, list):
         raise BlocksLoaderError("В объекте blocks.json отсутствует массив blocks")
     categories_meta = payload.get("categories", {})
+    blocks, alias_map = _normalise_entries(
+        blocks_data,
+        entry_type=Mapping,
+        params_key="parameters",
+        name_key="name",
+        categories_meta=categories_meta,
+    )
+
+    by_category = _group_by_category(blocks)
+    # Stored as parsed; require_registry_payload() hands out copies.
+    registry_payload = payload if isinstance(payload, dict) else dict(payload)
+    return NormalizedBlocks(
+        blocks=blocks,
+        by_category=by_category,
+        registry_payload=registry_payload,
+        source_format="mapping",
+        path=path,
+        aliases_map=alias_map,
+    )
+
+
+def _normalise_entries(
+    entries: Iterable[Any],
+    *,
+    entry_type: type,
+    params_key: str,
+    name_key: Optional[str] = None,
+    categories_meta: Optional[Mapping[str, Any]] = None,
+) -> Tuple[List[BlockSpec], Dict[str, str]]:
+    """Turn raw block entries of either file format into specs in a single pass.
+
+    The list (palette) and mapping (generator) formats differ only in the
+    params key, the optional ``name`` title fallback and category colours.
+    """
+
     blocks: List[BlockSpec] = []
     alias_map: Dict[str, str] = {}
-    for entry in blocks_data:
-        if not isinstance(entry, Mapping):
+    add_alias = alias_map.setdefault
+    add_block = blocks.append
+    for entry in entries:
+        if not isinstance(entry, entry_type):
             continue
         identifier = str(entry.get("id", "")).strip()
-        category = str(entry.get("category", "")).strip()
+        category = _intern(str(entry.get("category", "")).strip())
         if not identifier or not category:
             continue
-        title_source = entry.get("title") or entry.get("name") or identifier
-        title = str(title_source)
+        title_source = entry.get("title")
+        if not title_source and name_key is not None:
+            title_source = entry.get(name_key)
+        title = str(title_source or identifier)
         section_value = entry.get("section")
-        section = str(section_value) if isinstance(section_value, str) else None
+        section = _intern(section_value) if isinstance(section_value, str) else None
         description = entry.get("description")
         description = str(description) if isinstance(description, str) else None
-        color = None
-        if "color" in entry and isinstance(entry["color"], str):
-            color = entry["color"]
-        elif category in categories_meta:
+        color_value = entry.get("color")
+        color = color_value if isinstance(color_value, str) else None
+        if color is None and categories_meta and category in categories_meta:
             color_meta = categories_meta.get(category, {})
             color_value = color_meta.get("color") if isinstance(color_meta, Mapping) else None
             if isinstance(color_value, str):
                 color = color_value
-        params = _parse_params(entry.get("parameters", []))
+        params = _parse_params(entry.get(params_key, []))
         ports = _parse_ports(entry.get("ports", {}))
-        default_params = entry.get("default_params") if isinstance(entry.get("default_params"), dict) else {}
+        default_params = entry.get("default_params")
+        if not isinstance(default_params, dict):
+            default_params = {}
         aliases = _parse_aliases(entry.get("aliases"))
         for alias in aliases:
-            alias_map.setdefault(alias, identifier)
-        blocks.append(
+            add_alias(alias, identifier)
+        add_block(
             BlockSpec(
                 identifier=identifier,
                 category=category,
@@ -234,28 +284,20 @@ def _load_from_mapping(path: Path, payload: Mapping[str, Any]) -> NormalizedBloc
                 color=color,
                 params=params,
                 ports=ports,
-                default_params=dict(default_params),
+                default_params=default_params,
                 aliases=aliases,
-                raw=dict(entry),
+                # Entries come straight from the parser and are only read
+                # afterwards (to_palette_entry copies), so no copy here.
+                raw=entry,
             )
         )
-
-    by_category = _group_by_category(blocks)
-    registry_payload = copy.deepcopy(dict(payload))
-    return NormalizedBlocks(
-        blocks=blocks,
-        by_category=by_category,
-        registry_payload=registry_payload,
-        source_format="mapping",
-        path=path,
-        aliases_map=alias_map,
-    )
+    return blocks, alias_map
 
 
-def _parse_params(data: Any) -> List[BlockParamSpec]:
+def _parse_params(data: Any) -> Sequence[BlockParamSpec]:
+    if not data or not isinstance(data, Iterable):
+        return ()
     params: List[BlockParamSpec] = []
-    if not isinstance(data, Iterable):
-        return params
     for descriptor in data:
         if not isinstance(descriptor, Mapping):
             continue
@@ -263,7 +305,7 @@ def _parse_params(data: Any) -> List[BlockParamSpec]:
         if not name:
             continue
         type_value = descriptor.get("type")
-        param_type = str(type_value) if isinstance(type_value, str) else None
+        param_type = _intern(type_value) if isinstance(type_value, str) else None
         params.append(
             BlockParamSpec(
                 name=name,
@@ -275,10 +317,10 @@ def _parse_params(data: Any) -> List[BlockParamSpec]:
     return params
 
 
-def _parse_aliases(data: Any) -> List[str]:
+def _parse_aliases(data: Any) -> Sequence[str]:
+    if not data or not isinstance(data, Iterable):
+        return ()
     aliases: List[str] = []
-    if not isinstance(data, Iterable):
-        return aliases
     for alias in data:
         if isinstance(alias, str):
             value = alias.strip()
@@ -287,10 +329,10 @@ def _parse_aliases(data: Any) -> List[str]:
     return aliases
 
 
-def _parse_ports(data: Any) -> Dict[str, List[BlockPortSpec]]:
-    ports: Dict[str, List[BlockPortSpec]] = {"inputs": [], "outputs": []}
-    if not isinstance(data, Mapping):
-        return ports
+def _parse_ports(data: Any) -> Mapping[str, Sequence[BlockPortSpec]]:
+    if not data or not isinstance(data, Mapping):
+        return _EMPTY_PORTS
+    ports: Dict[str, Sequence[BlockPortSpec]] = {"inputs": [], "outputs": []}
     for direction in ("inputs", "outputs"):
         items = data.get(direction, [])
         if not isinstance(items, Iterable):
@@ -303,7 +345,7 @@ def _parse_ports(data: Any) -> Dict[str, List[BlockPortSpec]]:
             if not name:
                 continue
             type_value = descriptor.get("type")
-            dtype = str(type_value) if isinstance(type_value, str) else None
+            dtype = _intern(type_value) if isinstance(type_value, str) else None
             result.append(BlockPortSpec(name=name, direction=direction, type=dtype))
         ports[direction] = result
     return ports
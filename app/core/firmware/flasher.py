@@ -1,6 +1,7 @@
 """Инструменты компиляции и прошивки."""
 from __future__ import annotations
 
+import re
 import shlex
 import subprocess
 from dataclasses import dataclass
@@ -80,21 +81,20 @@ class FirmwareFlasher:
         return self._runner(command)
 
 
+# file:line:column: message; нежадное имя файла допускает пути вида C:\...
+_COMPILE_ERROR_RE = re.compile(r"^(.+?):(\d+):(\d+):(.*)$")
+
+
 def parse_compile_errors(output: str) -> List[CompileError]:
     """Разбор вывода компилятора для выделения ошибок."""
 
     errors: List[CompileError] = []
+    match_line = _COMPILE_ERROR_RE.match
     for line in output.splitlines():
-        parts = line.split(":")
-        if len(parts) < 4:
-            continue
-        filename, line_no, column, message_part = parts[0], parts[1], parts[2], ":".join(parts[3:])
-        try:
-            line_int = int(line_no)
-            column_int = int(column)
-        except ValueError:
+        match = match_line(line)
+        if match is None:
             continue
-        message = message_part.strip()
+        message = match.group(4).strip()
         if "error" in message.lower():
-            errors.append(CompileError(filename, line_int, column_int, message))
+            errors.append(CompileError(match.group(1), int(match.group(2)), int(match.group(3)), message))
     return errors
@@ -1,9 +1,12 @@
 """Генерация Arduino-кода из AST."""
 from __future__ import annotations
 
+import re
 from collections import defaultdict, OrderedDict
 from dataclasses import dataclass
-from typing import Dict, List, Mapping, MutableMapping, Optional
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, List, Mapping, MutableMapping, Optional, Tuple, Union
 
 from app.core.ast.ast_nodes import (
     BlockDefinition,
@@ -16,6 +19,11 @@ from app.core.ast.ast_nodes import (
 
 
 INDENT = "  "
+# Готовые строки отступов для типичной глубины вложенности
+_INDENTS = tuple(INDENT * level for level in range(16))
+_SECTION_ORDER = (Section.INCLUDES, Section.GLOBALS, Section.SETUP, Section.LOOP, Section.FUNCTIONS)
+# Подстановка вида {name}; неизвестные имена остаются в тексте как есть
+_PLACEHOLDER_RE = re.compile(r"\{([^{}]+)\}")
 
 
 @dataclass
@@ -37,15 +45,28 @@ class CodeGenerator:
     def __init__(self, registry: BlockRegistry, board: BoardProfile):
         self.registry = registry
         self.board = board
-        self.section_lines: Dict[Section, List[tuple[str, Optional[str]]]] = {
-            Section.INCLUDES: [],
-            Section.GLOBALS: [],
-            Section.SETUP: [],
-            Section.LOOP: [],
-            Section.FUNCTIONS: [],
-        }
+        # Строки секций и идентификаторы их блоков хранятся параллельными списками
+        self.section_texts: Dict[Section, List[str]] = {section: [] for section in _SECTION_ORDER}
+        self.section_ids: Dict[Section, List[Optional[str]]] = {section: [] for section in _SECTION_ORDER}
         self._include_cache: OrderedDict[str, Optional[str]] = OrderedDict()
         self._line_mapping: Dict[str, List[int]] = defaultdict(list)
+        # block_id -> (есть ли фрагменты кода, обработчик); см. _plan_for
+        self._plans: Dict[str, tuple] = {}
+
+    @property
+    def section_lines(self) -> Mapping[Section, Tuple[Tuple[str, Optional[str]], ...]]:
+        """Пары (строка, id блока) по секциям — представление для совместимости.
+
+        Только для чтения: строки добавляются в ``section_texts``/``section_ids``,
+        запись в этот снимок молча потерялась бы, поэтому он неизменяемый.
+        """
+
+        return MappingProxyType(
+            {
+                section: tuple(zip(self.section_texts[section], self.section_ids[section]))
+                for section in _SECTION_ORDER
+            }
+        )
 
     def build(self, program: ProgramNode) -> SketchBundle:
         if program.root is None:
@@ -60,8 +81,73 @@ class CodeGenerator:
         self, block: BlockInstance, target_section: Optional[Section], indent_level: int
     ) -> Optional[str]:
         definition = self._get_definition(block.definition_id)
+        plan = self._plans.get(definition.block_id)
+        if plan is None:
+            plan = self._plans[definition.block_id] = self._plan_for(definition)
+        has_snippets, handler = plan
+        return handler(block, definition, target_section, indent_level, has_snippets)
+
+    def _plan_for(self, definition: BlockDefinition) -> tuple:
+        """Выбрать обработчик блока один раз на определение.
+
+        Выбор зависит от наличия шаблона и фрагментов кода, а не от ``kind``:
+        событие может иметь шаблон, а инструкция — контейнеры.
+        """
+
+        has_snippets = bool(
+            definition.includes
+            or definition.globals_snippets
+            or definition.functions_snippets
+            or definition.setup_snippets
+        )
+        handler = self._process_template_block if definition.template else self._process_container_block
+        return has_snippets, handler
+
+    def _process_template_block(
+        self,
+        block: BlockInstance,
+        definition: BlockDefinition,
+        target_section: Optional[Section],
+        indent_level: int,
+        has_snippets: bool,
+    ) -> Optional[str]:
         context = self._build_context(block, definition)
+        if has_snippets:
+            self._emit_snippets(block, definition, context)
+
+        section = definition.section or target_section
+        if section is None:
+            raise CodeGenerationError(
+                f"Блок {definition.block_id} не привязан к секции и не передан target_section"
+            )
+        rendered = self._render_template(definition, block, context, indent_level)
+        if rendered:
+            lines = [line for line in rendered.splitlines() if line]
+            self.section_texts[section].extend(lines)
+            self.section_ids[section].extend([block.instance_id] * len(lines))
+        return rendered
+
+    def _process_container_block(
+        self,
+        block: BlockInstance,
+        definition: BlockDefinition,
+        target_section: Optional[Section],
+        indent_level: int,
+        has_snippets: bool,
+    ) -> Optional[str]:
+        if has_snippets:
+            self._emit_snippets(block, definition, self._build_context(block, definition))
+
+        # Если блок не имеет собственного шаблона, просто обработать дочерние контейнеры
+        for container in definition.containers:
+            for child in block.children.get(container.name, []):
+                child_indent = 1 if container.section in {Section.SETUP, Section.LOOP} else 0
+                self._process_block(child, container.section, child_indent)
+        return None
 
+    def _emit_snippets(
+        self, block: BlockInstance, definition: BlockDefinition, context: Mapping[str, object]
+    ) -> None:
         for include in definition.includes:
             self._add_include(include.format(**context), block.instance_id)
         for snippet in definition.globals_snippets:
@@ -72,25 +158,6 @@ class CodeGenerator:
             formatted = self._format(snippet, context, indent=1)
             self._add_line(Section.SETUP, formatted, block.instance_id)
 
-        if definition.template:
-            section = definition.section or target_section
-            if section is None:
-                raise CodeGenerationError(
-                    f"Блок {definition.block_id} не привязан к секции и не передан target_section"
-                )
-            rendered = self._render_template(definition, block, context, indent_level)
-            if rendered:
-                for line in rendered.splitlines():
-                    self._add_line(section, line, block.instance_id)
-            return rendered
-
-        # Если блок не имеет собственного шаблона, просто обработать дочерние контейнеры
-        for container in definition.containers:
-            for child in block.children.get(container.name, []):
-                child_indent = 1 if container.section in {Section.SETUP, Section.LOOP} else 0
-                self._process_block(child, container.section, child_indent)
-        return None
-
     def _render_template(
         self, definition: BlockDefinition, block: BlockInstance, context: Mapping[str, object], indent_level: int
     ) -> str:
@@ -113,72 +180,72 @@ class CodeGenerator:
             if joined:
                 joined = _indent_lines(joined, indent_level + 1)
             rendered_children[container.placeholder] = joined
-        filled = template
-        for placeholder, value in rendered_children.items():
-            filled = filled.replace(f"{{{placeholder}}}", value)
-        filled = self._format(filled, context, indent=indent_level)
-        return filled
+        if not template:
+            return ""
+        # Один проход по шаблону: дочерние контейнеры имеют приоритет над параметрами,
+        # а в тексте детей, как и раньше, подставляются параметры родителя
+        parts: List[str] = []
+        append = parts.append
+        for token in _compile_template(template):
+            if token.__class__ is str:
+                append(token)
+                continue
+            key = token[0]
+            if key in rendered_children:
+                child_text = rendered_children[key]
+                append(_substitute_context(child_text, context) if "{" in child_text else child_text)
+            elif key in context:
+                append(str(context[key]))
+            else:
+                append(f"{{{key}}}")
+        return _indent_lines("".join(parts), indent_level)
 
     def _assemble_code(self) -> str:
-        lines: List[str] = []
-        current_line_no = 0
-
-        def emit(section: Section, header: Optional[str] = None) -> None:
-            nonlocal current_line_no
-            if header:
-                lines.append(header)
-                current_line_no += 1
-            for text, block_id in self.section_lines[section]:
-                lines.append(text)
-                current_line_no += 1
-                if block_id:
-                    self._line_mapping.setdefault(block_id, []).append(current_line_no)
-            if section in {Section.GLOBALS, Section.SETUP, Section.LOOP} and self.section_lines[section]:
-                lines.append("")
-                current_line_no += 1
+        out_lines: List[str] = []
+        out_ids: List[Optional[str]] = []
+        texts_by_section = self.section_texts
+        ids_by_section = self.section_ids
+
+        def emit(section: Section, *, blank_after: bool = False) -> None:
+            texts = texts_by_section[section]
+            if not texts:
+                return
+            out_lines.extend(texts)
+            out_ids.extend(ids_by_section[section])
+            if blank_after:
+                out_lines.append("")
+                out_ids.append(None)
+
+        def literal(*texts: str) -> None:
+            out_lines.extend(texts)
+            out_ids.extend([None] * len(texts))
 
         if self._include_cache:
-            for include, block_id in self._include_cache.items():
-                self.section_lines[Section.INCLUDES].append((include, block_id))
+            texts_by_section[Section.INCLUDES].extend(self._include_cache.keys())
+            ids_by_section[Section.INCLUDES].extend(self._include_cache.values())
             self._include_cache.clear()
         emit(Section.INCLUDES)
-        emit(Section.GLOBALS, "\n// ===== Globals =====")
-        lines.append("void setup() {")
-        current_line_no += 1
-        if self.section_lines[Section.SETUP]:
-            for text, block_id in self.section_lines[Section.SETUP]:
-                lines.append(text)
-                current_line_no += 1
-                if block_id:
-                    self._line_mapping.setdefault(block_id, []).append(current_line_no)
-        lines.append("}")
-        current_line_no += 1
-        lines.append("")
-        current_line_no += 1
-        lines.append("void loop() {")
-        current_line_no += 1
-        if self.section_lines[Section.LOOP]:
-            for text, block_id in self.section_lines[Section.LOOP]:
-                lines.append(text)
-                current_line_no += 1
-                if block_id:
-                    self._line_mapping.setdefault(block_id, []).append(current_line_no)
-        lines.append("}")
-        current_line_no += 1
-
-        if self.section_lines[Section.FUNCTIONS]:
-            lines.append("")
-            current_line_no += 1
-            for text, block_id in self.section_lines[Section.FUNCTIONS]:
-                lines.append(text)
-                current_line_no += 1
-                if block_id:
-                    self._line_mapping.setdefault(block_id, []).append(current_line_no)
-
-        return "\n".join(lines).strip() + "\n"
+        literal("\n// ===== Globals =====")
+        emit(Section.GLOBALS, blank_after=True)
+        literal("void setup() {")
+        emit(Section.SETUP)
+        literal("}", "", "void loop() {")
+        emit(Section.LOOP)
+        literal("}")
+        if texts_by_section[Section.FUNCTIONS]:
+            literal("")
+            emit(Section.FUNCTIONS)
+
+        # Номер строки — позиция элемента в out_lines (с единицы)
+        mapping = self._line_mapping
+        for line_no, block_id in enumerate(out_ids, start=1):
+            if block_id:
+                mapping[block_id].append(line_no)
+
+        return "\n".join(out_lines).strip() + "\n"
 
     def _sections_as_text(self) -> Dict[Section, List[str]]:
-        return {section: [line for line, _ in lines] for section, lines in self.section_lines.items()}
+        return {section: list(texts) for section, texts in self.section_texts.items()}
 
     def _add_include(self, include: str, block_id: Optional[str]) -> None:
         include = include.strip()
@@ -188,7 +255,8 @@ class CodeGenerator:
     def _add_line(self, section: Section, text: str, block_id: Optional[str]) -> None:
         if not text:
             return
-        self.section_lines[section].append((text, block_id))
+        self.section_texts[section].append(text)
+        self.section_ids[section].append(block_id)
 
     def _build_context(self, block: BlockInstance, definition: BlockDefinition) -> MutableMapping[str, object]:
         context: Dict[str, object] = {param.name: block.values.get(param.name, param.default) for param in definition.parameters}
@@ -205,15 +273,56 @@ class CodeGenerator:
     def _format(template: str, context: Mapping[str, object], indent: int) -> str:
         if not template:
             return ""
-        formatted = template
-        for key, value in context.items():
-            formatted = formatted.replace(f"{{{key}}}", str(value))
+        formatted = _render_tokens(_compile_template(template), context)
         return _indent_lines(formatted, indent)
 
 
+@lru_cache(maxsize=1024)
+def _compile_template(template: str) -> Tuple[Union[str, Tuple[str]], ...]:
+    """Разбить шаблон на литералы (str) и подстановки (кортеж с именем).
+
+    Шаблоны и фрагменты блоков повторяются для каждого экземпляра, поэтому
+    разбор кэшируется по тексту шаблона.
+    """
+
+    tokens: List[Union[str, Tuple[str]]] = []
+    position = 0
+    for match in _PLACEHOLDER_RE.finditer(template):
+        if match.start() > position:
+            tokens.append(template[position : match.start()])
+        tokens.append((match.group(1),))
+        position = match.end()
+    if position < len(template):
+        tokens.append(template[position:])
+    return tuple(tokens)
+
+
+def _render_tokens(tokens: Tuple[Union[str, Tuple[str]], ...], context: Mapping[str, object]) -> str:
+    parts: List[str] = []
+    append = parts.append
+    for token in tokens:
+        if token.__class__ is str:
+            append(token)
+            continue
+        key = token[0]
+        append(str(context[key]) if key in context else f"{{{key}}}")
+    return "".join(parts)
+
+
+def _substitute_context(text: str, context: Mapping[str, object]) -> str:
+    def replace(match: "re.Match[str]") -> str:
+        key = match.group(1)
+        return str(context[key]) if key in context else match.group(0)
+
+    return _PLACEHOLDER_RE.sub(replace, text)
+
+
 def _indent_lines(text: str, indent_level: int) -> str:
-    indent = INDENT * indent_level
-    return "\n".join(f"{indent}{line}" if line else "" for line in text.splitlines())
+    lines = text.splitlines()
+    if indent_level <= 0:
+        return "\n".join(lines)
+    indent = _INDENTS[indent_level] if indent_level < len(_INDENTS) else INDENT * indent_level
+    return "\n".join([indent + line if line else line for line in lines])
 
 
 def build_sketch(program: ProgramNode, registry: BlockRegistry, board: BoardProfile) -> SketchBundle:
@@ -0,0 +1,106 @@
+"""Быстрое чтение и запись JSON с необязательным ``orjson``.
+
+Если пакет ``orjson`` установлен, разбор и сериализация выполняются им,
+иначе используется стандартный модуль :mod:`json`. Ошибки разбора в обоих
+случаях являются подклассами :class:`ValueError`.
+
+Результат не зависит от того, установлен ли ``orjson``: там, где он
+расходится со стандартным модулем (``NaN``/``Infinity``, целые длиннее
+64 бит), работа передаётся :mod:`json`.
+"""
+from __future__ import annotations
+
+import io
+import json
+import math
+import re
+from pathlib import Path
+from typing import Any, BinaryIO, Union
+
+try:  # pragma: no cover - зависит от окружения
+    import orjson
+except ImportError:  # pragma: no cover - зависит от окружения
+    orjson = None
+
+
+HAS_ORJSON = orjson is not None
+
+# orjson читает целые длиннее 64 бит как float; 20 цифр подряд — уже за пределом
+_LONG_DIGITS = re.compile(rb"\d{20}")
+_LONG_DIGITS_STR = re.compile(r"\d{20}")
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    """Разобрать JSON из байтов (UTF-8) или строки."""
+
+    if orjson is not None:
+        pattern = _LONG_DIGITS_STR if isinstance(data, str) else _LONG_DIGITS
+        if pattern.search(data) is None:
+            try:
+                return orjson.loads(data)
+            except orjson.JSONDecodeError:
+                # NaN/Infinity orjson не принимает; ошибку сообщит json
+                pass
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+
+def load_path(path: Path) -> Any:
+    """Прочитать и разобрать JSON-файл без промежуточного декодирования в ``str``."""
+
+    return loads(Path(path).read_bytes())
+
+
+def dumps(obj: Any, *, indent: bool = False) -> bytes:
+    """Сериализовать объект в UTF-8 JSON (``indent`` — отступ в два пробела)."""
+
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            data = orjson.dumps(obj, option=option)
+        except TypeError:
+            # целые длиннее 64 бит; для неподдерживаемых типов json сам бросит TypeError
+            data = None
+        # orjson пишет NaN и Infinity как null, json — как NaN/Infinity
+        if data is not None and (b"null" not in data or not _has_non_finite(obj)):
+            return data
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode("utf-8")
+
+
+def _has_non_finite(obj: Any) -> bool:
+    stack = [obj]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, dict):
+            stack.extend(value)
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return False
+
+
+def dump(obj: Any, fp: BinaryIO, *, indent: bool = False) -> None:
+    """Записать объект как UTF-8 JSON в двоичный файл.
+
+    Без ``orjson`` текст кодируется по частям через буфер файла, а не
+    собирается целиком в одну строку.
+    """
+
+    if orjson is not None:
+        fp.write(dumps(obj, indent=indent))
+        return
+    text = io.TextIOWrapper(fp, encoding="utf-8", newline="")
+    try:
+        json.dump(obj, text, ensure_ascii=False, indent=2 if indent else None)
+        text.flush()
+    finally:
+        text.detach()
+
+
+__all__ = ["HAS_ORJSON", "dump", "dumps", "load_path", "loads"]
@@ -1,11 +1,27 @@
 from __future__ import annotations
 
-import json
+import os
+import sys
+import tempfile
 from pathlib import Path
-from typing import Collection, Mapping, Optional, Tuple
+from typing import Any, Callable, Collection, Dict, Mapping, Optional, Tuple
 
+from app.core import jsonio
 from app.ui.canvas.model import BlockInstance, ConnectionModel, ProjectModel
 
+try:  # pragma: no cover - зависит от окружения
+    import ijson
+except ImportError:  # pragma: no cover - зависит от окружения
+    ijson = None
+
+
+# Файлы от этого размера разбираются потоково (если установлен ijson)
+STREAMING_THRESHOLD = 1_000_000
+# Общий пустой словарь для отсутствующих pos/params/from/to (только чтение)
+_EMPTY: Dict[str, Any] = {}
+# Типы блоков и имена портов повторяются тысячи раз — храним по одному объекту
+_intern = sys.intern
+
 
 def load_project_file(
     path: str | Path,
@@ -13,59 +29,172 @@ def load_project_file(
     aliases: Mapping[str, str] | None = None,
     known_blocks: Collection[str] | None = None,
 ) -> Tuple[ProjectModel, Optional[str], Optional[str]]:
-    """Load project definition from .robojson file."""
+    """Load project definition from .robojson file.
+
+    ``known_blocks`` is accepted for compatibility and is not used.
+    """
     project_path = Path(path)
-    data = json.loads(project_path.read_text(encoding="utf-8"))
+    alias_map = dict(aliases) if aliases is not None else {}
+
+    if ijson is not None and project_path.stat().st_size >= STREAMING_THRESHOLD:
+        try:
+            return _load_project(project_path, alias_map, _stream_project)
+        except ijson.JSONError:
+            # ijson строже json (NaN, Infinity): окончательное решение — за jsonio,
+            # он же сообщает об ошибке тем же исключением, что и для малых файлов
+            pass
+    return _load_project(project_path, alias_map, _read_project)
 
-    board = data.get("board")
-    port = data.get("port")
 
+def _load_project(
+    path: Path,
+    alias_map: Mapping[str, str],
+    read: Callable[[Path, Callable[[Any], None], Callable[[Any], None]], Tuple[Any, Any]],
+) -> Tuple[ProjectModel, Optional[str], Optional[str]]:
     model = ProjectModel()
-    alias_map = dict(aliases) if aliases is not None else {}
-    known_ids = set(known_blocks) if known_blocks is not None else None
-    for node in data.get("nodes", []):
-        if not isinstance(node, dict):
-            continue
-        uid = str(node.get("uid", "")) or None
-        type_id = str(node.get("type", ""))
-        pos = node.get("pos", {}) if isinstance(node.get("pos", {}), dict) else {}
-        params = node.get("params", {}) if isinstance(node.get("params", {}), dict) else {}
-        if not type_id:
-            continue
-        canonical_type = type_id
-        if alias_map:
-            if type_id in alias_map:
-                canonical_type = alias_map[type_id]
-            elif known_ids is not None and type_id not in known_ids:
-                canonical_type = alias_map.get(type_id, type_id)
-        if canonical_type != type_id:
-            print(f"[RoboLab] Блок {type_id} заменён на {canonical_type} (совместимость)")
-        block = BlockInstance(
-            uid=uid or type_id,
-            type_id=canonical_type,
-            x=float(pos.get("x", 0.0)),
-            y=float(pos.get("y", 0.0)),
-            params=dict(params),
-        )
-        model.add_block(block)
-
-    for edge in data.get("edges", []):
-        if not isinstance(edge, dict):
-            continue
-        src = edge.get("from", {}) if isinstance(edge.get("from", {}), dict) else {}
-        dst = edge.get("to", {}) if isinstance(edge.get("to", {}), dict) else {}
-        connection = ConnectionModel(
-            from_block_uid=str(src.get("node", "")),
-            from_port=str(src.get("port", "")),
-            to_block_uid=str(dst.get("node", "")),
-            to_port=str(dst.get("port", "")),
-        )
-        if connection.from_block_uid and connection.to_block_uid:
-            model.add_connection(connection)
+    add_block = model.add_block
+    add_connection = model.add_connection
+    block_from_node = _block_from_node
+    connection_from_edge = _connection_from_edge
+
+    def on_node(node: Any) -> None:
+        block = block_from_node(node, alias_map)
+        if block is not None:
+            add_block(block)
+
+    def on_edge(edge: Any) -> None:
+        connection = connection_from_edge(edge)
+        if connection is not None:
+            add_connection(connection)
 
+    board, port = read(path, on_node, on_edge)
     return model, board, port
 
 
+def _not_an_object(path: Path) -> ValueError:
+    return ValueError(f"Project file {path} must contain a JSON object")
+
+
+def _read_project(
+    path: Path, on_node: Callable[[Any], None], on_edge: Callable[[Any], None]
+) -> Tuple[Any, Any]:
+    """Разобрать проект целиком в памяти."""
+
+    data = jsonio.load_path(path)
+    if not isinstance(data, dict):
+        raise _not_an_object(path)
+    nodes = data.get("nodes")
+    if isinstance(nodes, list):
+        for node in nodes:
+            on_node(node)
+    edges = data.get("edges")
+    if isinstance(edges, list):
+        for edge in edges:
+            on_edge(edge)
+    return data.get("board"), data.get("port")
+
+
+def _block_from_node(node: Any, alias_map: Mapping[str, str]) -> Optional[BlockInstance]:
+    if not isinstance(node, dict):
+        return None
+    uid = str(node.get("uid", "")) or None
+    type_id = str(node.get("type", ""))
+    pos = node.get("pos")
+    if not isinstance(pos, dict):
+        pos = _EMPTY
+    params = node.get("params")
+    if not isinstance(params, dict):
+        params = _EMPTY
+    if not type_id:
+        return None
+    canonical_type = type_id
+    if alias_map:
+        # Неизвестный тип без алиаса остаётся как есть — достаточно одного
+        # обращения к словарю
+        alias = alias_map.get(type_id)
+        if alias is not None and alias != type_id:
+            canonical_type = alias
+            print(f"[RoboLab] Блок {type_id} заменён на {canonical_type} (совместимость)")
+    return BlockInstance(
+        uid=uid or type_id,
+        type_id=_intern(canonical_type),
+        x=float(pos.get("x", 0.0)),
+        y=float(pos.get("y", 0.0)),
+        params=dict(params),
+    )
+
+
+def _connection_from_edge(edge: Any) -> Optional[ConnectionModel]:
+    if not isinstance(edge, dict):
+        return None
+    src = edge.get("from")
+    if not isinstance(src, dict):
+        src = _EMPTY
+    dst = edge.get("to")
+    if not isinstance(dst, dict):
+        dst = _EMPTY
+    connection = ConnectionModel(
+        from_block_uid=str(src.get("node", "")),
+        from_port=_intern(str(src.get("port", ""))),
+        to_block_uid=str(dst.get("node", "")),
+        to_port=_intern(str(dst.get("port", ""))),
+    )
+    if connection.from_block_uid and connection.to_block_uid:
+        return connection
+    return None
+
+
+def _stream_project(
+    path: Path, on_node: Callable[[Any], None], on_edge: Callable[[Any], None]
+) -> Tuple[Any, Any]:
+    """Разобрать проект за один проход ijson, передавая узлы и связи по одному.
+
+    Полное дерево JSON в памяти не строится: одновременно существует только
+    текущий элемент ``nodes``/``edges``. Результат совпадает с :func:`_read_project`.
+    """
+
+    header: Dict[str, Any] = {}
+    handlers = {"nodes.item": on_node, "edges.item": on_edge}
+    # nodes/edges, которые действительно являются массивами
+    arrays = set()
+    builder = None
+    item_prefix = ""
+    with path.open("rb") as handle:
+        events = ijson.parse(handle, use_float=True)
+        # пустой файл ijson сам отклоняет с JSONError
+        if next(events)[1] != "start_map":
+            raise _not_an_object(path)
+        for prefix, event, value in events:
+            if builder is not None:
+                builder.event(event, value)
+                if prefix == item_prefix and event in ("end_map", "end_array"):
+                    handler = handlers.get(item_prefix)
+                    if handler is not None:
+                        handler(builder.value)
+                    else:
+                        header[item_prefix] = builder.value
+                    builder = None
+                continue
+            if prefix in handlers:
+                if prefix[:5] in arrays and event in ("start_map", "start_array"):
+                    builder = ijson.ObjectBuilder()
+                    builder.event(event, value)
+                    item_prefix = prefix
+                # Скалярные элементы не являются узлами или связями — пропускаем
+                continue
+            if prefix == "nodes" or prefix == "edges":
+                if event == "start_array":
+                    arrays.add(prefix)
+            elif prefix == "board" or prefix == "port":
+                if event in ("start_map", "start_array"):
+                    builder = ijson.ObjectBuilder()
+                    builder.event(event, value)
+                    item_prefix = prefix
+                else:
+                    header[prefix] = value
+    return header.get("board"), header.get("port")
+
+
 def save_project_file(
     path: str | Path,
     model: ProjectModel,
@@ -74,7 +203,9 @@ def save_project_file(
     port: Optional[str] = None,
 ) -> None:
     """Serialize project model into .robojson file."""
-    project_path = Path(path)
+    # Через символическую ссылку сохраняем в её цель: os.replace заменил бы
+    # саму ссылку обычным файлом
+    project_path = Path(path).resolve()
     project_path.parent.mkdir(parents=True, exist_ok=True)
 
     data = {
@@ -86,7 +217,8 @@ def save_project_file(
                 "uid": block.uid,
                 "type": block.type_id,
                 "pos": {"x": block.x, "y": block.y},
-                "params": dict(block.params),
+                # Сериализатор только читает params, поэтому копия не нужна
+                "params": block.params if type(block.params) is dict else dict(block.params),
             }
             for block in model.blocks
         ],
@@ -100,4 +232,35 @@ def save_project_file(
         ],
     }
 
-    project_path.write_text(json.dumps(data, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    # Пишем во временный файл рядом и подменяем им проект только после
+    # успешной сериализации: ошибка не должна оставить пустой файл
+    handle = tempfile.NamedTemporaryFile(
+        "wb",
+        buffering=1 << 20,
+        dir=project_path.parent,
+        prefix=f".{project_path.name}.",
+        suffix=".tmp",
+        delete=False,
+    )
+    tmp_path = Path(handle.name)
+    try:
+        with handle:
+            jsonio.dump(data, handle, indent=True)
+            handle.write(b"\n")
+        os.chmod(tmp_path, _file_mode(project_path))
+        os.replace(tmp_path, project_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def _file_mode(path: Path) -> int:
+    """Права для сохраняемого файла: как у существующего, иначе по umask."""
+    try:
+        return path.stat().st_mode & 0o777
+    except OSError:
+        pass
+    # umask можно только прочитать вместе с установкой — сразу возвращаем прежнюю
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
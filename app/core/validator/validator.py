@@ -2,9 +2,27 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Callable, ClassVar, Dict, List, Optional
 
-from app.core.ast.ast_nodes import BlockInstance, BlockRegistry, BoardProfile, ProgramNode, Section
+from app.core.ast.ast_nodes import (
+    BlockDefinition,
+    BlockInstance,
+    BlockParameter,
+    BlockRegistry,
+    BoardProfile,
+    ProgramNode,
+    Section,
+)
+
+
+# Бит секции в маске использованных секций
+_SECTION_BIT: Dict[Section, int] = {section: 1 << index for index, section in enumerate(Section)}
+_SETUP_BIT = _SECTION_BIT[Section.SETUP]
+_GLOBALS_BIT = _SECTION_BIT[Section.GLOBALS]
+_LOOP_BIT = _SECTION_BIT[Section.LOOP]
+# Секции, которые не должны быть пустыми, в порядке вывода ошибок
+_REQUIRED_SECTIONS = tuple(sorted((Section.SETUP, Section.LOOP), key=lambda s: s.value))
+_REQUIRED_MASK = _SETUP_BIT | _LOOP_BIT
 
 
 @dataclass
@@ -26,68 +44,119 @@ class ProgramValidator:
     def __init__(self, registry: BlockRegistry, board: BoardProfile):
         self.registry = registry
         self.board = board
+        # Множество вместо линейного поиска по массиву выводов платы
+        self._digital_pins = frozenset(board.pins.digital)
+        self._pin_errors: Dict[object, Optional[str]] = {}
+
+    def validate(self, program: ProgramNode, *, max_errors: int = 0) -> List[ValidationError]:
+        """Проверить программу.
+
+        ``max_errors`` > 0 ограничивает число ошибок: обход прекращается, как
+        только они набраны (удобно для проверки при каждом изменении в
+        редакторе). 0 — без ограничения.
+        """
 
-    def validate(self, program: ProgramNode) -> List[ValidationError]:
         errors: List[ValidationError] = []
         if program.root is None:
             errors.append(ValidationError("Проект не содержит корневого блока EV_START"))
             return errors
 
-        encountered_sections = {Section.INCLUDES, Section.GLOBALS, Section.SETUP, Section.LOOP, Section.FUNCTIONS}
-        used_sections = set()
-
-        def walk(block: BlockInstance) -> None:
-            try:
-                definition = self.registry.get(block.definition_id)
-            except KeyError:
+        # Использованные секции — битовая маска, см. _SECTION_BIT
+        used_sections = 0
+        # Определения, найденные за этот вызов; None — тип отсутствует в реестре
+        definitions: Dict[str, Optional[BlockDefinition]] = {}
+        registry_get = self.registry.get
+        param_validators = self._PARAM_VALIDATORS
+        # Соседние блоки часто одного типа — сначала проверяется последний найденный
+        last_id: Optional[str] = None
+        last_definition: Optional[BlockDefinition] = None
+
+        # Обход в прямом порядке через явный стек: дети кладутся в обратном
+        # порядке, поэтому ошибки выводятся в той же последовательности, что
+        # и при рекурсивном обходе
+        stack: List[BlockInstance] = [program.root]
+        pop = stack.pop
+        while stack:
+            if max_errors and len(errors) >= max_errors:
+                # Обход не завершён — проверки секций были бы недостоверны
+                return errors[:max_errors]
+            block = pop()
+            definition_id = block.definition_id
+            if definition_id == last_id:
+                definition = last_definition
+            elif definition_id in definitions:
+                definition = definitions[definition_id]
+            else:
+                try:
+                    definition = registry_get(definition_id)
+                except KeyError:
+                    definition = None
+                definitions[definition_id] = definition
+            last_id, last_definition = definition_id, definition
+            if definition is None:
                 errors.append(ValidationError("Неизвестный тип блока", block.instance_id))
-                return
+                continue
 
             if definition.section:
-                used_sections.add(definition.section)
+                used_sections |= _SECTION_BIT[definition.section]
             if definition.setup_snippets:
-                used_sections.add(Section.SETUP)
+                used_sections |= _SETUP_BIT
             if definition.globals_snippets:
-                used_sections.add(Section.GLOBALS)
+                used_sections |= _GLOBALS_BIT
 
+            values = block.values
             for param in definition.parameters:
-                value = block.values.get(param.name, param.default)
+                name = param.name
+                value = values.get(name, param.default)
                 if value is None:
                     errors.append(
-                        ValidationError(f"Не задан параметр '{param.name}'", block.instance_id)
+                        ValidationError(f"Не задан параметр '{name}'", block.instance_id)
                     )
                     continue
-                if param.type == "digital_pin":
-                    self._validate_digital_pin(value, block, errors)
-                elif param.type == "int":
-                    self._ensure_int(value, param.name, block, errors)
-
-            for container in definition.containers:
-                for child in block.children.get(container.name, []):
-                    walk(child)
+                check = param_validators.get(param.type)
+                if check is not None:
+                    check(self, value, param, block, errors)
 
-        walk(program.root)
+            children = block.children
+            for container in reversed(definition.containers):
+                nested = children.get(container.name)
+                if nested:
+                    stack.extend(reversed(nested))
 
-        if Section.LOOP not in used_sections:
+        if not used_sections & _LOOP_BIT:
             errors.append(ValidationError("В цикле loop() отсутствуют исполняемые блоки"))
 
-        missing_sections = encountered_sections - used_sections - {Section.INCLUDES, Section.GLOBALS, Section.FUNCTIONS}
-        for section in sorted(missing_sections, key=lambda s: s.value):
-            if section in {Section.SETUP, Section.LOOP}:
-                errors.append(ValidationError(f"Секция '{section.value}' пуста"))
+        missing_sections = _REQUIRED_MASK & ~used_sections
+        if missing_sections:
+            for section in _REQUIRED_SECTIONS:
+                if missing_sections & _SECTION_BIT[section]:
+                    errors.append(ValidationError(f"Секция '{section.value}' пуста"))
 
-        return errors
+        return errors[:max_errors] if max_errors else errors
 
     def _validate_digital_pin(
         self, value: object, block: BlockInstance, errors: List[ValidationError]
     ) -> None:
+        # В программе обычно немного различных номеров пинов: результат
+        # проверки запоминается по значению и не пересчитывается
         try:
-            pin = int(str(value).replace("A", "")) if str(value).startswith("A") else int(value)
+            message = self._pin_errors[value]
+        except KeyError:
+            message = self._pin_errors[value] = self._digital_pin_error(value)
+        except TypeError:  # нехешируемое значение
+            message = self._digital_pin_error(value)
+        if message is not None:
+            errors.append(ValidationError(message, block.instance_id))
+
+    def _digital_pin_error(self, value: object) -> Optional[str]:
+        text = value if isinstance(value, str) else str(value)
+        try:
+            pin = int(text.replace("A", "")) if text.startswith("A") else int(value)
         except (TypeError, ValueError):
-            errors.append(ValidationError("Неверный формат пина", block.instance_id))
-            return
-        if pin not in self.board.pins.digital:
-            errors.append(ValidationError(f"Пин D{pin} недоступен для платы {self.board.name}", block.instance_id))
+            return "Неверный формат пина"
+        if pin not in self._digital_pins:
+            return f"Пин D{pin} недоступен для платы {self.board.name}"
+        return None
 
     @staticmethod
     def _ensure_int(value: object, name: str, block: BlockInstance, errors: List[ValidationError]) -> None:
@@ -96,8 +165,26 @@ class ProgramValidator:
         except (TypeError, ValueError):
             errors.append(ValidationError(f"Параметр '{name}' должен быть числом", block.instance_id))
 
+    # ---------- проверки по типу параметра: (self, value, param, block, errors)
+    def _check_digital_pin(
+        self, value: object, param: BlockParameter, block: BlockInstance, errors: List[ValidationError]
+    ) -> None:
+        self._validate_digital_pin(value, block, errors)
+
+    def _check_int(
+        self, value: object, param: BlockParameter, block: BlockInstance, errors: List[ValidationError]
+    ) -> None:
+        self._ensure_int(value, param.name, block, errors)
+
+    _PARAM_VALIDATORS: ClassVar[Dict[str, Callable[..., None]]] = {
+        "digital_pin": _check_digital_pin,
+        "int": _check_int,
+    }
+
 
-def validate_program(program: ProgramNode, registry: BlockRegistry, board: BoardProfile) -> List[ValidationError]:
+def validate_program(
+    program: ProgramNode, registry: BlockRegistry, board: BoardProfile, *, max_errors: int = 0
+) -> List[ValidationError]:
     """Удобная функция-обёртка."""
 
-    return ProgramValidator(registry, board).validate(program)
+    return ProgramValidator(registry, board).validate(program, max_errors=max_errors)
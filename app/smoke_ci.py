@@ -1,7 +1,7 @@
 # app/smoke_ci.py
 from __future__ import annotations
-import sys, os, ast, io, json, traceback
-from typing import Dict, List, Tuple
+import sys, os, ast, io, json, re, traceback
+from typing import AbstractSet, Any, Container, Dict, List, Optional, Tuple
 
 # Абсолютный путь к корню пакета app/
 APP_DIR = os.path.abspath(os.path.dirname(__file__))
@@ -21,6 +21,99 @@ def read_text(path: str) -> str:
     with io.open(path, "r", encoding="utf-8") as f:
         return f.read()
 
+# Результаты AST-проверки между запусками: {путь: [размер, mtime_ns]} для
+# файлов, которые успешно разобрались. Грамматика зависит от версии Python,
+# поэтому у каждого интерпретатора свой файл кэша
+PARSE_CACHE_PATH = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "robolab_smoke-py{}.{}.json".format(*sys.version_info[:2]),
+)
+
+def _load_parse_cache() -> Dict[str, List[int]]:
+    try:
+        with open(PARSE_CACHE_PATH, "rb") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+def _save_parse_cache(cache: Dict[str, List[int]]) -> None:
+    try:
+        os.makedirs(os.path.dirname(PARSE_CACHE_PATH), exist_ok=True)
+        tmp_path = PARSE_CACHE_PATH + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, PARSE_CACHE_PATH)
+    except OSError:
+        pass  # кэш необязателен
+
+# Содержимое файлов по относительному пути: каждый файл читается один раз
+_SOURCES: Dict[str, bytearray] = {}
+
+def _probe(rel: str) -> Optional[Tuple[str, os.stat_result]]:
+    """Абсолютный путь и os.stat файла (один системный вызов) или None, если файла нет."""
+    abspath = os.path.join(REPO_ROOT, rel)
+    try:
+        return abspath, os.stat(abspath)
+    except OSError:
+        return None
+
+def read_source(rel: str, st: Optional[os.stat_result] = None) -> bytearray:
+    """Байты файла из репозитория (с кэшированием); OSError, если файла нет.
+
+    Буфер выделяется сразу по размеру из ``st`` (или fstat) и заполняется
+    readinto без промежуточной буферизации.
+    """
+    src = _SOURCES.get(rel)
+    if src is None:
+        with open(os.path.join(REPO_ROOT, rel), "rb", buffering=0) as f:
+            size = (st or os.fstat(f.fileno())).st_size
+            src = bytearray(size)
+            read = f.readinto(src)
+            if read < size:
+                del src[read:]
+            else:
+                src += f.readall()  # файл мог вырасти после stat
+        _SOURCES[rel] = src
+    return src
+
+# Подстроки-инварианты. Все они ищутся за один проход регулярного выражения;
+# просмотр вперёд находит и перекрывающиеся вхождения. Ни одна строка не должна
+# быть префиксом другой — в одной позиции засчитывается только первая.
+NEEDLES: Tuple[bytes, ...] = (
+    b'BLOCK_MIME = "application/x-robolab-block"',
+    b"from ..common.mime import BLOCK_MIME",
+    b'catalog_defaults = metadata.get("default_params")',
+    b"MIME_BLOCK",
+    b"<<<<<<<",
+    b"=======",
+    b">>>>>>>",
+    b"def delete_selection",
+    b"QApplication.focusWidget",
+    b"mime.setData(BLOCK_MIME",
+    b"class BlockItem",
+    b"class PortItem",
+    b"class ConnectionItem",
+    "Удалить выделенное".encode("utf-8"),
+    b"_TEXT_INPUT_WIDGETS",
+    b"TEXT_INPUT_WIDGETS",
+)
+_NEEDLE_RE = re.compile(b"(?=(" + b"|".join(map(re.escape, NEEDLES)) + b"))")
+
+def find_needles(rel: str) -> AbstractSet[bytes]:
+    """Какие из NEEDLES встречаются в файле; OSError, если файла нет."""
+    return frozenset(bytes(match.group(1)) for match in _NEEDLE_RE.finditer(read_source(rel)))
+
+def _parse_source(rel: str, src: bytearray) -> Tuple[bool, str]:
+    path = os.path.join(REPO_ROOT, rel)
+    try:
+        ast.parse(src, filename=path)
+        return True, ""
+    except SyntaxError as e:
+        return False, f"{path}: SyntaxError: {e}"
+    except Exception as e:
+        return False, f"{path}: Unexpected error: {e}"
+
 def ast_parse_ok(path: str) -> Tuple[bool, str]:
     try:
         src = read_text(path)
@@ -31,36 +124,33 @@ def ast_parse_ok(path: str) -> Tuple[bool, str]:
     except Exception as e:
         return False, f"{path}: Unexpected error: {e}"
 
-def must_contain(text: str, needle: str, label: str) -> Tuple[bool, str]:
+def must_contain(text: Container[Any], needle: Any, label: str) -> Tuple[bool, str]:
     if needle in text:
         return True, ""
     return False, f"{label} not found"
 
+def _default_merge(metadata: Dict[Any, Any], params: object) -> Dict[str, object]:
+    """Copy of the add_block_at default merge: default_params -> legacy params[] -> overrides."""
+    defaults: Dict[str, object] = {}
+    catalog_defaults = metadata.get("default_params")
+    if isinstance(catalog_defaults, dict):
+        defaults.update({str(k): v for k, v in catalog_defaults.items()})
+    else:
+        params_meta = metadata.get("params")
+        if isinstance(params_meta, list):
+            for descriptor in params_meta:
+                if not isinstance(descriptor, dict):
+                    continue
+                name = descriptor.get("name")
+                if name is not None:
+                    defaults[str(name)] = descriptor.get("default")
+    if isinstance(params, dict):
+        for k, v in params.items():
+            defaults[str(k)] = v
+    return defaults
+
 def _simulate_default_merge() -> Dict[str, object]:
     """Reproduce the add_block_at default merge snippet for verification."""
-    namespace: Dict[str, object] = {}
-    exec(
-        "def merge(metadata, params):\n"
-        "    defaults = {}\n"
-        "    catalog_defaults = metadata.get('default_params')\n"
-        "    if isinstance(catalog_defaults, dict):\n"
-        "        defaults.update({str(k): v for k, v in catalog_defaults.items()})\n"
-        "    else:\n"
-        "        params_meta = metadata.get('params')\n"
-        "        if isinstance(params_meta, list):\n"
-        "            for descriptor in params_meta:\n"
-        "                if not isinstance(descriptor, dict):\n"
-        "                    continue\n"
-        "                name = descriptor.get('name')\n"
-        "                if name is not None:\n"
-        "                    defaults[str(name)] = descriptor.get('default')\n"
-        "    if isinstance(params, dict):\n"
-        "        for k, v in params.items():\n"
-        "            defaults[str(k)] = v\n"
-        "    return defaults\n",
-        namespace,
-    )
-
     metadata = {
         "default_params": {"threshold": 0.5, 7: "lucky"},
         "params": [
@@ -70,33 +160,47 @@ def _simulate_default_merge() -> Dict[str, object]:
         ],
     }
     overrides = {"mode": "manual", 11: 42}
-    merged = namespace["merge"](metadata, overrides)
-    return merged
+    return _default_merge(metadata, overrides)
 
 def main() -> int:
     errors: List[str] = []
 
-    # 1) Проверка наличия файлов
+    # 1-2) Наличие файлов и AST-парсинг (не требует PySide6) за один проход;
+    # файлы, не изменившиеся с прошлого успешного разбора, не разбираются повторно
+    parse_errors: List[str] = []
+    parse_cache = _load_parse_cache()
+    cache_dirty = False
     for rel in FILES_AST_CHECK:
-        abspath = os.path.join(REPO_ROOT, rel)
-        if not os.path.exists(abspath):
+        probe = _probe(rel)
+        if probe is None:
             errors.append(f"Missing file: {rel}")
-
-    # 2) AST-парсинг (не требует PySide6)
-    for rel in FILES_AST_CHECK:
-        abspath = os.path.join(REPO_ROOT, rel)
-        if not os.path.exists(abspath):
             continue
-        ok, msg = ast_parse_ok(abspath)
-        if not ok:
-            errors.append(msg)
+        abspath, st = probe
+        key = [st.st_size, st.st_mtime_ns]
+        if parse_cache.get(abspath) == key:
+            continue
+        try:
+            src = read_source(rel, st)
+        except OSError:
+            errors.append(f"Missing file: {rel}")
+            continue
+        ok, msg = _parse_source(rel, src)
+        if ok:
+            parse_cache[abspath] = key
+        else:
+            parse_cache.pop(abspath, None)
+            parse_errors.append(msg)
+        cache_dirty = True
+    errors.extend(parse_errors)
+    if cache_dirty:
+        _save_parse_cache(parse_cache)
 
-    # 3) Инварианты по содержимому
+    # 3) Инварианты по содержимому (все подстроки файла — за один проход)
     try:
-        mime_src = read_text(os.path.join(REPO_ROOT, "app/ui/common/mime.py"))
+        mime_hits = find_needles("app/ui/common/mime.py")
         ok, msg = must_contain(
-            mime_src,
-            'BLOCK_MIME = "application/x-robolab-block"',
+            mime_hits,
+            b'BLOCK_MIME = "application/x-robolab-block"',
             "BLOCK_MIME constant",
         )
         if not ok:
@@ -105,76 +209,76 @@ def main() -> int:
         errors.append(f"mime.py read failed: {e}")
 
     try:
-        scene_src = read_text(os.path.join(REPO_ROOT, "app/ui/canvas/canvas_scene.py"))
+        scene_hits = find_needles("app/ui/canvas/canvas_scene.py")
         # Должен импортировать общий BLOCK_MIME
         ok, msg = must_contain(
-            scene_src,
-            "from ..common.mime import BLOCK_MIME",
+            scene_hits,
+            b"from ..common.mime import BLOCK_MIME",
             "canvas_scene imports BLOCK_MIME",
         )
         if not ok:
             errors.append(f"canvas_scene.py: {msg}")
         # Проверка на наличие блока слияния default_params
-        if 'catalog_defaults = metadata.get("default_params")' not in scene_src:
+        if b'catalog_defaults = metadata.get("default_params")' not in scene_hits:
             errors.append("canvas_scene.py: default_params merge block missing")
         # Не должно быть legacy-символа
-        if "MIME_BLOCK" in scene_src:
+        if b"MIME_BLOCK" in scene_hits:
             errors.append("canvas_scene.py: legacy MIME_BLOCK symbol detected")
         # Не должно быть маркеров конфликта
-        if "<<<<<<<" in scene_src or "=======" in scene_src or ">>>>>>>" in scene_src:
+        if b"<<<<<<<" in scene_hits or b"=======" in scene_hits or b">>>>>>>" in scene_hits:
             errors.append("canvas_scene.py: merge markers detected")
         # Хелпер удаления
-        if "def delete_selection" not in scene_src:
+        if b"def delete_selection" not in scene_hits:
             errors.append("canvas_scene.py: delete_selection helper missing")
     except Exception as e:
         errors.append(f"canvas_scene.py read failed: {e}")
 
     try:
-        widgets_view_src = read_text(os.path.join(REPO_ROOT, "app/ui/widgets/canvas_view.py"))
+        widgets_view_hits = find_needles("app/ui/widgets/canvas_view.py")
     except Exception:
-        widgets_view_src = ""
+        widgets_view_hits = frozenset()
 
     try:
-        canvas_view_src = read_text(os.path.join(REPO_ROOT, "app/ui/canvas/canvas_view.py"))
+        canvas_view_hits = find_needles("app/ui/canvas/canvas_view.py")
     except Exception:
-        canvas_view_src = ""
+        canvas_view_hits = frozenset()
 
-    if "QApplication.focusWidget" not in widgets_view_src and "QApplication.focusWidget" not in canvas_view_src:
+    if b"QApplication.focusWidget" not in widgets_view_hits and b"QApplication.focusWidget" not in canvas_view_hits:
         errors.append("canvas_view.py: focus guard for Delete missing")
 
     try:
-        block_list_src = read_text(os.path.join(REPO_ROOT, "app/ui/widgets/block_list.py"))
+        block_list_hits = find_needles("app/ui/widgets/block_list.py")
         ok, msg = must_contain(
-            block_list_src,
-            "mime.setData(BLOCK_MIME",
+            block_list_hits,
+            b"mime.setData(BLOCK_MIME",
             "block_list uses shared BLOCK_MIME",
         )
         if not ok:
             errors.append(f"block_list.py: {msg}")
-        if "from ..common.mime import BLOCK_MIME" not in block_list_src:
+        if b"from ..common.mime import BLOCK_MIME" not in block_list_hits:
             errors.append("block_list.py: BLOCK_MIME import missing")
     except Exception as e:
         errors.append(f"block_list.py read failed: {e}")
 
     try:
-        items_src = read_text(os.path.join(REPO_ROOT, "app/ui/canvas/items.py"))
+        items_hits = find_needles("app/ui/canvas/items.py")
         for cls in ["class BlockItem", "class PortItem", "class ConnectionItem"]:
-            ok, msg = must_contain(items_src, cls, f"{cls} declaration")
+            ok, msg = must_contain(items_hits, cls.encode(), f"{cls} declaration")
             if not ok:
                 errors.append(f"items.py: {msg}")
-        if "<<<<<<<" in items_src or "=======" in items_src or ">>>>>>>" in items_src:
+        if b"<<<<<<<" in items_hits or b"=======" in items_hits or b">>>>>>>" in items_hits:
             errors.append("items.py: merge markers detected")
     except Exception as e:
         errors.append(f"items.py read failed: {e}")
 
     try:
-        main_src = read_text(os.path.join(REPO_ROOT, "app/ui/main_window.py"))
-        if "Удалить выделенное" not in main_src:
+        main_hits = find_needles("app/ui/main_window.py")
+        if "Удалить выделенное".encode("utf-8") not in main_hits:
             errors.append("main_window.py: Delete action missing")
-        if "QApplication.focusWidget" not in main_src:
+        if b"QApplication.focusWidget" not in main_hits:
             errors.append("main_window.py: focus guard missing")
         # Разрешаем разные варианты имени кортежа виджетов ввода
-        if "_TEXT_INPUT_WIDGETS" not in main_src and "TEXT_INPUT_WIDGETS" not in main_src:
+        if b"_TEXT_INPUT_WIDGETS" not in main_hits and b"TEXT_INPUT_WIDGETS" not in main_hits:
             errors.append("main_window.py: text input guard tuple missing")
     except Exception as e:
         errors.append(f"main_window.py read failed: {e}")
@@ -227,9 +331,9 @@ def main() -> int:
         serialised = scenario_model.to_dict()
         roundtrip = json.loads(json.dumps(serialised))
         restored = ProjectModel.from_dict(roundtrip)
+        alive_uids = {block.uid for block in restored.blocks}
         if any(
-            conn.from_block_uid not in {block.uid for block in restored.blocks}
-            or conn.to_block_uid not in {block.uid for block in restored.blocks}
+            conn.from_block_uid not in alive_uids or conn.to_block_uid not in alive_uids
             for conn in restored.connections
         ):
             errors.append("ProjectModel: roundtrip produced dangling connections")
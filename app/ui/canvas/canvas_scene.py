@@ -2,10 +2,10 @@
 from __future__ import annotations
 """Graphics scene implementing drag-and-drop, connections, and project sync."""
 
-from collections import deque
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+from uuid import uuid4
 
-from PySide6.QtCore import QPointF, Qt, QMimeData, Signal
+from PySide6.QtCore import SIGNAL, QPointF, Qt, QMimeData, QTimer, Signal
 from PySide6.QtGui import QColor
 from PySide6.QtWidgets import (
     QGraphicsScene,
@@ -15,32 +15,83 @@ from PySide6.QtWidgets import (
 )
 
 from ..common.mime import BLOCK_MIME
-from .items import BlockItem, ConnectionItem, PortItem, PortSpec, GRID_SIZE
+from .items import BlockItem, ConnectionItem, PortItem, PortSpec, GRID_SIZE, snap_to_grid
 from .model import BlockInstance, ConnectionModel, ProjectModel
 
+ConnectionKey = Tuple[str, str, str, str]
+GridCell = Tuple[int, int]
+
+# сторона ячейки сетки поиска портов: блок с портами занимает 2–4 ячейки
+_PORT_CELL_SIZE = GRID_SIZE * 8
+
+# Порты блока без описания в каталоге: единственный выход "out"
+_DEFAULT_PORT_SPECS: Tuple[Tuple[PortSpec, ...], Tuple[PortSpec, ...]] = (
+    (),
+    (PortSpec(name="out", direction="out", dtype=None),),
+)
+
+
+def _release_edge(graph: Dict[str, Dict[str, int]], head: str, tail: str) -> None:
+    """Уменьшить счётчик ребра head -> tail, убирая опустевшие записи."""
+    targets = graph.get(head)
+    if targets is None:
+        return
+    count = targets.get(tail, 0) - 1
+    if count > 0:
+        targets[tail] = count
+    else:
+        targets.pop(tail, None)
+        if not targets:
+            del graph[head]
+
 
 class CanvasScene(QGraphicsScene):
     # события в UI
     blockAdded = Signal(BlockInstance)
     blocksRemoved = Signal(int)
     connectionsRemoved = Signal(int)
+    # итог одного удаления: (блоков, соединений); вместо projectModelChanged
+    itemsRemoved = Signal(int, int)
     connectionAdded = Signal(ConnectionModel)
     projectModelChanged = Signal(ProjectModel)
     statusMessage = Signal(str, int)
     blockPropertiesRequested = Signal(BlockItem)
 
+    PREVIEW_UPDATE_INTERVAL_MS = 16
+
     def __init__(self, parent=None) -> None:
         super().__init__(parent)
 
+        # блоки постоянно двигаются, а поиск портов идёт по своим словарям —
+        # BSP-индекс пришлось бы перестраивать на каждое перемещение
+        self.setItemIndexMethod(QGraphicsScene.NoIndex)
         # большой рабочий лист
         self.setSceneRect(-5000, -5000, 10000, 10000)
 
         # модель / отображение
         self._project_model = ProjectModel()
         self._block_items: Dict[str, BlockItem] = {}
-        self._connection_items: Dict[str, ConnectionItem] = {}
+        # ключ — ConnectionModel.key_tuple(): (from_uid, from_port, to_uid, to_port)
+        self._connection_items: Dict[ConnectionKey, ConnectionItem] = {}
+        # uid блока -> ключи его связей (dict как упорядоченное множество)
+        self._conns_by_block: Dict[str, Dict[ConnectionKey, None]] = {}
+        # граф блоков для проверки циклов: from_uid -> {to_uid: число связей}
+        self._adjacency: Dict[str, Dict[str, int]] = {}
+        # обратный граф: to_uid -> {from_uid: число связей}
+        self._reverse_adjacency: Dict[str, Dict[str, int]] = {}
+        # сетка для поиска портов: ячейка -> uid блоков, чья зона портов её задевает
+        self._block_cells: Dict[GridCell, Dict[str, None]] = {}
+        self._cells_by_block: Dict[str, Tuple[GridCell, ...]] = {}
+        # порядок добавления блоков = порядок наложения в сцене (позже — выше)
+        self._stack_order: Dict[str, int] = {}
+        self._next_stack_index = 0
         self._block_catalog: Dict[str, Dict[str, object]] = {}
-        self._grid_size = GRID_SIZE
+        self._title_by_type: Dict[str, str] = {}
+        # type_id -> (входы, выходы); PortSpec неизменяемы и разделяются блоками
+        self._port_specs_by_type: Dict[str, Tuple[Tuple[PortSpec, ...], Tuple[PortSpec, ...]]] = {}
+        # type_id -> значения параметров по умолчанию (копируются в каждый блок)
+        self._default_params_by_type: Dict[str, Dict[str, object]] = {}
+        self._grid_size: int = GRID_SIZE
 
         # фон и drop
         self.setBackgroundBrush(QColor("#202020"))
@@ -49,44 +100,116 @@ class CanvasScene(QGraphicsScene):
         # состояние превью соединения
         self._connection_preview: Optional[ConnectionItem] = None
         self._connection_start_port: Optional[PortItem] = None
+        # движения мыши приходят чаще, чем перерисовывается экран: конец превью
+        # запоминается и применяется по таймеру не чаще раза за кадр
+        self._pending_preview_end: Optional[QPointF] = None
+        self._last_preview_end: Optional[QPointF] = None
+        self._preview_timer = QTimer(self)
+        self._preview_timer.setSingleShot(True)
+        self._preview_timer.setInterval(self.PREVIEW_UPDATE_INTERVAL_MS)
+        self._preview_timer.timeout.connect(self._apply_pending_preview_end)
 
     # ------------------------------------------------------------ catalog/model
     def set_block_catalog(self, catalog: Dict[str, Dict[str, object]]) -> None:
         """catalog: {type_id: metadata} — хранение метаданных блоков из палитры."""
         self._block_catalog = dict(catalog)
+        # заголовки по типу — чтобы не ходить по вложенным словарям на каждый блок
+        self._title_by_type = {
+            type_id: str(metadata.get("title", type_id))
+            for type_id, metadata in self._block_catalog.items()
+            if isinstance(metadata, dict)
+        }
+        self._port_specs_by_type = {
+            type_id: self._port_specs_for(metadata)
+            for type_id, metadata in self._block_catalog.items()
+            if isinstance(metadata, dict)
+        }
+        self._default_params_by_type = {
+            type_id: self._default_params_for(metadata)
+            for type_id, metadata in self._block_catalog.items()
+            if isinstance(metadata, dict)
+        }
+
+    @staticmethod
+    def _default_params_for(metadata: Dict[str, object]) -> Dict[str, object]:
+        defaults: Dict[str, object] = {}
+        # --- единая логика сборки дефолтов: default_params -> legacy params[]
+        catalog_defaults = metadata.get("default_params")
+        if isinstance(catalog_defaults, dict):
+            # современный формат каталога: словарь значений по умолчанию
+            defaults.update({str(k): v for k, v in catalog_defaults.items()})
+        else:
+            # совместимость со старыми каталогами: извлекаем из params[]
+            params_meta = metadata.get("params")
+            if isinstance(params_meta, list):
+                for descriptor in params_meta:
+                    if not isinstance(descriptor, dict):
+                        continue
+                    name = descriptor.get("name")
+                    if name is not None:
+                        defaults[str(name)] = descriptor.get("default")
+        return defaults
+
+    def _title_for(self, type_id: str) -> str:
+        return self._title_by_type.get(type_id, type_id)
 
     def notify_block_params_changed(self, block_item: BlockItem) -> None:
         """Emit project change notification for updated block parameters."""
-        title = self._block_catalog.get(block_item.block.type_id, {}).get(
-            "title", block_item.block.type_id
-        )
+        title = self._title_for(block_item.block.type_id)
         self._notify_model_change()
         self._emit_status(f"Параметры обновлены: {title}")
 
     def request_properties(self, block_item: BlockItem) -> None:
         self.blockPropertiesRequested.emit(block_item)
 
+    def reset(self) -> None:
+        """Очистить сцену и начать пустой проект."""
+        self._clear_items()
+        self._project_model = ProjectModel()
+
     def load_model(self, model: ProjectModel) -> None:
         """Загрузить полную модель проекта в сцену."""
+        self._clear_items()
+        self._project_model = model.clone()
+
+        # Сигналы сцены на время массовой вставки заблокированы, итог сообщается после
+        was_blocked = self.blockSignals(True)
+        project_model = self._project_model
+        create_block_item = self._create_item_for_block
+        create_connection_item = self._create_connection_item
+        lost_connections = 0
+        try:
+            for block in project_model.blocks:
+                create_block_item(block)
+            if len(self._block_items) != len(project_model.blocks):
+                # повторяющиеся uid: в модели остаётся блок, попавший в сцену последним
+                project_model.blocks = [item.block for item in self._block_items.values()]
+
+            for connection in list(project_model.connections):
+                if create_connection_item(connection) is None:
+                    # если не смогли восстановить — удалим из модели
+                    project_model.remove_connection(connection)
+                    lost_connections += 1
+        finally:
+            self.blockSignals(was_blocked)
+        if lost_connections:
+            self._emit_status("Не удалось восстановить соединение при загрузке проекта", 6000)
+
+    def _clear_items(self) -> None:
         self._cancel_connection_preview()
         self.clear()
         self._block_items.clear()
         self._connection_items.clear()
-        self._project_model = model.clone()
-
-        for block in self._project_model.blocks:
-            self._create_item_for_block(block)
-
-        for connection in list(self._project_model.connections):
-            if self._create_connection_item(connection) is None:
-                # если не смогли восстановить — удалим из модели
-                self._project_model.remove_connection(connection)
+        self._conns_by_block.clear()
+        self._adjacency.clear()
+        self._reverse_adjacency.clear()
+        self._block_cells.clear()
+        self._cells_by_block.clear()
+        self._stack_order.clear()
 
     def model(self) -> ProjectModel:
-        # вернуть актуальную модель (с координатами из item'ов)
-        for uid, item in self._block_items.items():
-            item.block.x, item.block.y = item.pos().x(), item.pos().y()
-        self._project_model.blocks = [item.block for item in self._block_items.values()]
+        # модель всегда актуальна: координаты пишет BlockItem.itemChange,
+        # список блоков меняется вместе с _block_items
         return self._project_model
 
     # ------------------------------------------------------------- block CRUD
@@ -99,44 +222,34 @@ class CanvasScene(QGraphicsScene):
         params: Optional[Dict[str, object]] = None,
     ) -> BlockItem:
         """Создать новый блок указанного типа и добавить на сцену."""
-        from uuid import uuid4
-        metadata = self._block_catalog.get(type_id, {})
-        defaults: Dict[str, object] = {}
-
-        # --- единая логика сборки дефолтов: default_params -> legacy params[] -> overrides
-        catalog_defaults = metadata.get("default_params")
-        if isinstance(catalog_defaults, dict):
-            # современный формат каталога: словарь значений по умолчанию
-            defaults.update({str(k): v for k, v in catalog_defaults.items()})
-        else:
-            # совместимость со старыми каталогами: извлекаем из params[]
-            params_meta = metadata.get("params")
-            if isinstance(params_meta, list):
-                for descriptor in params_meta:
-                    if not isinstance(descriptor, dict):
-                        continue
-                    name = descriptor.get("name")
-                    if name is not None:
-                        defaults[str(name)] = descriptor.get("default")
+        # дефолты типа собраны в set_block_catalog; копия — у каждого блока своя
+        defaults = dict(self._default_params_by_type.get(type_id, ()))
 
         # пользовательские overrides накрывают библиотечные дефолты
         if isinstance(params, dict):
             for key, value in params.items():
                 defaults[str(key)] = value
 
+        # блок сразу встаёт в узел сетки, кто бы ни вызвал метод
+        grid_size = self._grid_size
         block = BlockInstance(
             uid=uid or str(uuid4()),
             type_id=type_id,
-            x=pos.x(),
-            y=pos.y(),
-            params=dict(defaults),
+            x=float(snap_to_grid(pos.x(), grid_size)),
+            y=float(snap_to_grid(pos.y(), grid_size)),
+            params=defaults,
         )
-        self._project_model.add_block(block)
+        previous = self._block_items.get(block.uid)
+        if previous is None:
+            self._project_model.add_block(block)
+        else:
+            # тот же uid: новый блок занимает место прежнего в модели
+            blocks = self._project_model.blocks
+            blocks[next(i for i, b in enumerate(blocks) if b is previous.block)] = block
         item = self._create_item_for_block(block)
         self.blockAdded.emit(block)
         self._notify_model_change()
-        title = self._block_catalog.get(type_id, {}).get("title", type_id)
-        self._emit_status(f"Добавлен блок: {title}")
+        self._emit_status(f"Добавлен блок: {self._title_for(type_id)}")
         return item
 
     # ------------------------------------------------------------- deletion API
@@ -170,16 +283,27 @@ class CanvasScene(QGraphicsScene):
         connections = [item for item in selected if isinstance(item, ConnectionItem)]
         blocks = [item for item in selected if isinstance(item, BlockItem)]
 
-        # сначала связи — затем блоки
-        for connection in connections:
-            if self._remove_connection_item(connection):
-                removed_connections += 1
-
-        for block in blocks:
-            uid = block.block.uid
-            removed_connections += self._remove_connections_for_block(uid)
-            self._remove_block_item(block)
-            removed_blocks += 1
+        # removeItem для выделенного элемента испускает selectionChanged, то есть
+        # по сигналу на каждый элемент; на время пакета сигналы сцены блокируются,
+        # а selectionChanged отправляется один раз в конце
+        was_blocked = self.blockSignals(True)
+        remove_connection_item = self._remove_connection_item
+        remove_connections_for_block = self._remove_connections_for_block
+        remove_block_item = self._remove_block_item
+        try:
+            # сначала связи — затем блоки
+            for connection in connections:
+                if remove_connection_item(connection):
+                    removed_connections += 1
+
+            for block in blocks:
+                removed_connections += remove_connections_for_block(block.block.uid)
+                remove_block_item(block)
+                removed_blocks += 1
+        finally:
+            self.blockSignals(was_blocked)
+        if not was_blocked and (removed_blocks or removed_connections):
+            self.selectionChanged.emit()
 
         if finalise and (removed_blocks or removed_connections):
             self._finalise_removal(removed_blocks, removed_connections)
@@ -190,6 +314,8 @@ class CanvasScene(QGraphicsScene):
         uid = item.block.uid
         self._remove_block_from_models(uid, item)
         self._block_items.pop(uid, None)
+        self._drop_block_cells(uid)
+        self._stack_order.pop(uid, None)
         self.removeItem(item)
 
     def _remove_selected_items(self) -> tuple[int, int]:
@@ -223,14 +349,21 @@ class CanvasScene(QGraphicsScene):
         return False
 
     def _finalise_removal(self, removed_blocks: int, removed_connections: int) -> None:
+        if not (removed_blocks or removed_connections):
+            return
+        # Подписчикам достаточно itemsRemoved: projectModelChanged с копией модели
+        # не отправляется, раздельные сигналы — только если к ним кто-то подключён
+        parts: List[str] = []
         if removed_blocks:
-            self.blocksRemoved.emit(removed_blocks)
-            self._emit_status(f"Удалено блоков: {removed_blocks}")
+            if self.receivers(SIGNAL("blocksRemoved(int)")) > 0:
+                self.blocksRemoved.emit(removed_blocks)
+            parts.append(f"блоков {removed_blocks}")
         if removed_connections:
-            self.connectionsRemoved.emit(removed_connections)
-            self._emit_status(f"Удалено соединений: {removed_connections}")
-        if removed_blocks or removed_connections:
-            self._notify_model_change()
+            if self.receivers(SIGNAL("connectionsRemoved(int)")) > 0:
+                self.connectionsRemoved.emit(removed_connections)
+            parts.append(f"соединений {removed_connections}")
+        self.itemsRemoved.emit(removed_blocks, removed_connections)
+        self._emit_status("Удалено: " + ", ".join(parts))
 
     # --------------------------------------------------------------- DnD events
     def dragEnterEvent(self, event: QGraphicsSceneDragDropEvent) -> None:  # type: ignore[override]
@@ -250,12 +383,16 @@ class CanvasScene(QGraphicsScene):
     def dropEvent(self, event: QGraphicsSceneDragDropEvent) -> None:  # type: ignore[override]
         md: QMimeData = event.mimeData()
         if md.hasFormat(BLOCK_MIME) and self._accept_drops_enabled:
-            payload = bytes(md.data(BLOCK_MIME))
-            type_id = payload.decode("utf-8").strip()
-            pos = event.scenePos()
-            gx = round(pos.x() / self._grid_size) * self._grid_size
-            gy = round(pos.y() / self._grid_size) * self._grid_size
-            self.add_block_at(type_id, QPointF(gx, gy))
+            try:
+                type_id = md.data(BLOCK_MIME).data().decode("utf-8").strip()
+            except UnicodeDecodeError:
+                event.ignore()
+                return
+            if not type_id:
+                # пустой payload — не создаём блок без типа
+                event.ignore()
+                return
+            self.add_block_at(type_id, event.scenePos())
             event.acceptProposedAction()
         else:
             event.ignore()
@@ -269,7 +406,9 @@ class CanvasScene(QGraphicsScene):
 
     def mouseMoveEvent(self, event) -> None:  # type: ignore[override]
         if self._connection_preview is not None:
-            self._connection_preview.set_temp_end(event.scenePos())
+            self._pending_preview_end = QPointF(event.scenePos())
+            if not self._preview_timer.isActive():
+                self._preview_timer.start()
         super().mouseMoveEvent(event)
 
     def mouseReleaseEvent(self, event) -> None:  # type: ignore[override]
@@ -295,8 +434,8 @@ class CanvasScene(QGraphicsScene):
             return
         self._cancel_connection_preview()
         self._connection_start_port = port
+        # без конечной точки путь превью строится в якорь начального порта
         preview = ConnectionItem(port, preview=True)
-        preview.set_temp_end(port.connection_anchor())
         self._connection_preview = preview
         self.addItem(preview)
         self._emit_status("Перетащите соединение к целевому входу")
@@ -328,8 +467,7 @@ class CanvasScene(QGraphicsScene):
 
         from_uid = start_port.block_item.block.uid
         to_uid = port.block_item.block.uid
-        key = self._connection_key(from_uid, start_port.name, to_uid, port.name)
-        if key in self._connection_items:
+        if (from_uid, start_port.name, to_uid, port.name) in self._connection_items:
             self._emit_status("Такое соединение уже существует")
             self._cancel_connection_preview()
             return
@@ -349,24 +487,18 @@ class CanvasScene(QGraphicsScene):
         item = ConnectionItem(start_port, port, model=connection_model, preview=False)
         self._register_connection_item(connection_model, item)
 
-        title_from = self._block_catalog.get(start_port.block_item.block.type_id, {}).get(
-            "title", start_port.block_item.block.type_id
-        )
-        title_to = self._block_catalog.get(port.block_item.block.type_id, {}).get(
-            "title", port.block_item.block.type_id
-        )
         self.connectionAdded.emit(connection_model)
         self._notify_model_change()
-        self._emit_status(f"Создано соединение: {title_from} → {title_to}")
+        # заголовки нужны только для строки статуса — без слушателей не собираем её
+        if self.receivers(SIGNAL("statusMessage(QString,int)")) > 0:
+            title_from = self._title_for(start_port.block_item.block.type_id)
+            title_to = self._title_for(port.block_item.block.type_id)
+            self._emit_status(f"Создано соединение: {title_from} → {title_to}")
 
     # ---------------------------------------------------------------- helpers
     def _create_item_for_block(self, block: BlockInstance, title: Optional[str] = None) -> BlockItem:
-        metadata = self._block_catalog.get(block.type_id, {})
-        final_title = title or str(metadata.get("title", block.type_id))
-        ports_in = self._make_port_specs(metadata.get("inputs", []), direction="in")
-        ports_out = self._make_port_specs(metadata.get("outputs", []), direction="out")
-        if not ports_out:
-            ports_out = [PortSpec(name="out", direction="out", dtype=None)]
+        final_title = title or self._title_for(block.type_id)
+        ports_in, ports_out = self._port_specs_by_type.get(block.type_id, _DEFAULT_PORT_SPECS)
         try:
             item = BlockItem(
                 block,
@@ -379,9 +511,47 @@ class CanvasScene(QGraphicsScene):
             item = BlockItem(block, title=final_title)  # совместимость со старыми версиями
         self.addItem(item)
         self._block_items[block.uid] = item
+        self._stack_order[block.uid] = self._next_stack_index
+        self._next_stack_index += 1
         item.setPos(block.x, block.y)
+        self._place_block_cells(item)
         return item
 
+    def notify_block_moved(self, block_item: BlockItem) -> None:
+        """Обновить положение блока в сетке поиска портов."""
+        if self._block_items.get(block_item.block.uid) is block_item:
+            self._place_block_cells(block_item)
+
+    def _place_block_cells(self, item: BlockItem) -> None:
+        uid = item.block.uid
+        self._drop_block_cells(uid)
+        margin = PortItem.HIT_RADIUS
+        size = _PORT_CELL_SIZE
+        rect = item.sceneBoundingRect()
+        columns = range(int((rect.left() - margin) // size), int((rect.right() + margin) // size) + 1)
+        rows = range(int((rect.top() - margin) // size), int((rect.bottom() + margin) // size) + 1)
+        cells = tuple((column, row) for column in columns for row in rows)
+        block_cells = self._block_cells
+        for cell in cells:
+            block_cells.setdefault(cell, {})[uid] = None
+        self._cells_by_block[uid] = cells
+
+    def _drop_block_cells(self, uid: str) -> None:
+        block_cells = self._block_cells
+        for cell in self._cells_by_block.pop(uid, ()):
+            uids = block_cells.get(cell)
+            if uids is not None:
+                uids.pop(uid, None)
+                if not uids:
+                    del block_cells[cell]
+
+    def _port_specs_for(
+        self, metadata: Dict[str, object]
+    ) -> Tuple[Tuple[PortSpec, ...], Tuple[PortSpec, ...]]:
+        ports_in = tuple(self._make_port_specs(metadata.get("inputs", []), direction="in"))
+        ports_out = tuple(self._make_port_specs(metadata.get("outputs", []), direction="out"))
+        return ports_in, ports_out or _DEFAULT_PORT_SPECS[1]
+
     def _make_port_specs(self, payload, *, direction: str) -> List[PortSpec]:
         result: List[PortSpec] = []
         if isinstance(payload, list):
@@ -397,32 +567,58 @@ class CanvasScene(QGraphicsScene):
         return result
 
     def _register_connection_item(self, connection: ConnectionModel, item: ConnectionItem) -> None:
-        key = connection.key()
+        key = connection.key_tuple()
+        if key not in self._connection_items:
+            self._index_connection(key, connection)
         self._connection_items[key] = item
+        # путь уже построен в конструкторе ConnectionItem: якоря портов не
+        # зависят от того, добавлена ли связь в сцену
         self.addItem(item)
-        item.update_path()
         item.start_port.add_connection(item)
         item.start_port.block_item.register_connection(item)
         if item.end_port is not None:
             item.end_port.add_connection(item)
             item.end_port.block_item.register_connection(item)
 
+    def _index_connection(self, key: ConnectionKey, connection: ConnectionModel) -> None:
+        conns_by_block = self._conns_by_block
+        conns_by_block.setdefault(connection.from_block_uid, {})[key] = None
+        conns_by_block.setdefault(connection.to_block_uid, {})[key] = None
+        from_uid = connection.from_block_uid
+        to_uid = connection.to_block_uid
+        targets = self._adjacency.setdefault(from_uid, {})
+        targets[to_uid] = targets.get(to_uid, 0) + 1
+        sources = self._reverse_adjacency.setdefault(to_uid, {})
+        sources[from_uid] = sources.get(from_uid, 0) + 1
+
+    def _unindex_connection(self, key: ConnectionKey, connection: ConnectionModel) -> None:
+        for uid in (connection.from_block_uid, connection.to_block_uid):
+            keys = self._conns_by_block.get(uid)
+            if keys is not None:
+                keys.pop(key, None)
+                if not keys:
+                    del self._conns_by_block[uid]
+        _release_edge(self._adjacency, connection.from_block_uid, connection.to_block_uid)
+        _release_edge(self._reverse_adjacency, connection.to_block_uid, connection.from_block_uid)
+
     def _remove_connections_for_block(self, uid: str) -> int:
         removed = 0
-        for item in list(self._connection_items.values()):
-            model = item.model
-            if model and (model.from_block_uid == uid or model.to_block_uid == uid):
-                if self._remove_connection_item(item):
-                    removed += 1
+        connection_items = self._connection_items
+        remove_connection_item = self._remove_connection_item
+        for key in self._conns_by_block.pop(uid, ()):
+            item = connection_items.get(key)
+            if item is not None and remove_connection_item(item):
+                removed += 1
         return removed
 
     def _remove_connection_item(self, item: ConnectionItem) -> bool:
         model = item.model
         if model is None:
             return False
-        key = model.key()
+        key = model.key_tuple()
         if key in self._connection_items:
             self._connection_items.pop(key, None)
+            self._unindex_connection(key, model)
         item.detach()
         self._remove_connection_from_models(model, item)
         self.removeItem(item)
@@ -463,17 +659,33 @@ class CanvasScene(QGraphicsScene):
         return block_item.get_port(name, direction)
 
     def _port_at(self, pos: QPointF, direction: Optional[str] = None) -> Optional[PortItem]:
-        for item in self.items(pos):
-            if isinstance(item, PortItem):
-                if direction is None or item.direction == direction:
-                    return item
+        # кандидаты — блоки из ячейки сетки под курсором, сверху вниз;
+        # порты выступают за край блока на радиус зоны попадания
+        size = _PORT_CELL_SIZE
+        uids = self._block_cells.get((int(pos.x() // size), int(pos.y() // size)))
+        if not uids:
+            return None
+        margin = PortItem.HIT_RADIUS
+        block_items = self._block_items
+        for uid in sorted(uids, key=self._stack_order.__getitem__, reverse=True):
+            block_item = block_items[uid]
+            if not block_item.sceneBoundingRect().adjusted(-margin, -margin, margin, margin).contains(pos):
+                continue
+            if direction == "in":
+                ports = block_item.ports_in()
+            elif direction == "out":
+                ports = block_item.ports_out()
+            else:
+                ports = (*block_item.ports_in(), *block_item.ports_out())
+            for port in ports:
+                if port.contains(port.mapFromScene(pos)):
+                    return port
         return None
 
     def _create_connection_item(self, connection: ConnectionModel) -> Optional[ConnectionItem]:
         start = self._find_port(connection.from_block_uid, connection.from_port, "out")
         end = self._find_port(connection.to_block_uid, connection.to_port, "in")
         if start is None or end is None:
-            self._emit_status("Не удалось восстановить соединение при загрузке проекта", 6000)
             return None
         item = ConnectionItem(start, end, model=connection, preview=False)
         self._register_connection_item(connection, item)
@@ -482,31 +694,53 @@ class CanvasScene(QGraphicsScene):
     def _creates_cycle(self, from_uid: str, to_uid: str) -> bool:
         if from_uid == to_uid:
             return True
-        adjacency: Dict[str, List[str]] = {}
-        for connection in self._project_model.connections:
-            adjacency.setdefault(connection.from_block_uid, []).append(connection.to_block_uid)
-        adjacency.setdefault(from_uid, []).append(to_uid)
-        visited = set()
-        queue: deque[str] = deque([to_uid])
-        while queue:
-            current = queue.popleft()
-            if current == from_uid:
-                return True
-            for neighbour in adjacency.get(current, []):
+        if from_uid not in self._reverse_adjacency:
+            # в from_uid не входит ни одна связь — из to_uid до него не дойти
+            return False
+        # новая связь from_uid -> to_uid замкнёт цикл, если from_uid уже достижим из to_uid
+        # для достижимости порядок обхода не важен: стек на списке дешевле deque
+        adjacency = self._adjacency
+        visited = {to_uid}
+        stack = [to_uid]
+        while stack:
+            for neighbour in adjacency.get(stack.pop(), ()):
+                if neighbour == from_uid:
+                    return True
                 if neighbour not in visited:
                     visited.add(neighbour)
-                    queue.append(neighbour)
+                    stack.append(neighbour)
         return False
 
     def _are_types_compatible(self, source: PortItem, target: PortItem) -> bool:
-        src = (source.dtype or "").lower()
-        dst = (target.dtype or "").lower()
-        return (not src or src in {"any", "*"}) or (not dst or dst in {"any", "*"}) or (src == dst)
+        src = source.compat_dtype
+        dst = target.compat_dtype
+        return src == "*" or dst == "*" or src == dst
+
+    def _apply_pending_preview_end(self) -> None:
+        end, self._pending_preview_end = self._pending_preview_end, None
+        if end is None or self._connection_preview is None:
+            return
+        last = self._last_preview_end
+        if last is not None:
+            # сдвиг меньше экранного пикселя не виден — путь не перестраиваем
+            dx = end.x() - last.x()
+            dy = end.y() - last.y()
+            if dx * dx + dy * dy < self._preview_min_step_sq():
+                return
+        self._last_preview_end = end
+        self._connection_preview.set_temp_end(end)
 
-    def _connection_key(self, from_uid: str, from_port: str, to_uid: str, to_port: str) -> str:
-        return f"{from_uid}:{from_port}->{to_uid}:{to_port}"
+    def _preview_min_step_sq(self) -> float:
+        """Квадрат одного экранного пикселя в единицах сцены."""
+        views = self.views()
+        scale = views[0].transform().m11() if views else 1.0
+        step = 1.0 / scale if scale > 0 else 1.0
+        return step * step
 
     def _cancel_connection_preview(self) -> None:
+        self._preview_timer.stop()
+        self._pending_preview_end = None
+        self._last_preview_end = None
         if self._connection_preview is not None:
             self.removeItem(self._connection_preview)
         self._connection_preview = None
@@ -11,6 +11,13 @@ from PySide6.QtWidgets import QGraphicsEllipseItem, QGraphicsItem, QGraphicsPath
 from .model import BlockInstance
 
 GRID_SIZE = 20  # экспортируется в сцену
+# типы портов, совместимые с любым другим
+_ANY_DTYPES = frozenset(("any", "*"))
+
+
+def snap_to_grid(value: float, grid_size: int) -> int:
+    """Ближайший узел сетки (половина шага — к чётному узлу, как у round)."""
+    return round(value / grid_size) * grid_size
 
 
 @dataclass(frozen=True)
@@ -47,6 +54,9 @@ class BlockItem(QGraphicsItem):
         self.setFlag(QGraphicsItem.ItemIsMovable, True)
         self.setFlag(QGraphicsItem.ItemIsSelectable, True)
         self.setFlag(QGraphicsItem.ItemSendsGeometryChanges, True)
+        # блок рисуется одинаково, пока не сменится выделение: Qt берёт готовый
+        # пиксмап вместо повторного paint() при перерисовке под превью и связями
+        self.setCacheMode(QGraphicsItem.DeviceCoordinateCache)
         self.setZValue(1)
 
         self._port_specs_in = list(ports_in or [])
@@ -97,12 +107,20 @@ class BlockItem(QGraphicsItem):
         if change == QGraphicsItem.ItemPositionHasChanged:
             # «прилипание» к сетке и обновление модели
             pos = self.pos()
-            gx = round(pos.x() / self.grid_size) * self.grid_size
-            gy = round(pos.y() / self.grid_size) * self.grid_size
-            self.block.x, self.block.y = gx, gy
-            self.setPos(gx, gy)
+            gx = snap_to_grid(pos.x(), self.grid_size)
+            gy = snap_to_grid(pos.y(), self.grid_size)
+            if gx != pos.x() or gy != pos.y():
+                # setPos снова вызовет itemChange уже для узла сетки —
+                # модель и связи обновятся там один раз
+                self.setPos(gx, gy)
+                return super().itemChange(change, value)
+            # модель сцены не перечитывает позиции — координаты пишутся здесь
+            self.block.x, self.block.y = pos.x(), pos.y()
             for connection in list(self._connections):
                 connection.update_path()
+            notify_moved = getattr(self.scene(), "notify_block_moved", None)
+            if callable(notify_moved):
+                notify_moved(self)
         return super().itemChange(change, value)
 
     def mouseDoubleClickEvent(self, event) -> None:  # type: ignore[override]
@@ -154,6 +172,7 @@ class BlockItem(QGraphicsItem):
 class PortItem(QGraphicsEllipseItem):
     """Interactive port item used for connections."""
     RADIUS = 6.0
+    HIT_RADIUS = RADIUS + 3.0
     COLOR_DEFAULT = QColor(236, 239, 241)
     COLOR_HOVER = QColor(255, 241, 118)
 
@@ -164,6 +183,8 @@ class PortItem(QGraphicsEllipseItem):
         self.spec = spec
         self.direction = spec.direction
         self.dtype = spec.dtype.lower() if isinstance(spec.dtype, str) else None
+        # тип для проверки совместимости: пустой и "any" сводятся к "*"
+        self.compat_dtype = "*" if not self.dtype or self.dtype in _ANY_DTYPES else self.dtype
         self.setBrush(self.COLOR_DEFAULT)
         self.setPen(QPen(QColor(84, 110, 122), 1.5))
         self.setZValue(2)
@@ -176,7 +197,7 @@ class PortItem(QGraphicsEllipseItem):
 
     # увеличенная область попадания для удобства
     def shape(self) -> QPainterPath:  # type: ignore[override]
-        r = self.RADIUS + 3.0
+        r = self.HIT_RADIUS
         path = QPainterPath()
         path.addEllipse(QRectF(-r, -r, r * 2, r * 2))
         return path
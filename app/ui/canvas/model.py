@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Dict, List
+from typing import Dict, List, Tuple
 import copy
 
 
@@ -46,6 +46,10 @@ class ConnectionModel:
         """Unique key of the connection (stable)."""
         return f"{self.from_block_uid}:{self.from_port}->{self.to_block_uid}:{self.to_port}"
 
+    def key_tuple(self) -> Tuple[str, str, str, str]:
+        """Ключ связи для словарей сцены: кортеж без форматирования строки."""
+        return (self.from_block_uid, self.from_port, self.to_block_uid, self.to_port)
+
     def to_dict(self) -> Dict[str, object]:
         # сохранение в «плоском» формате (совместимо со старыми проектами)
         return {
@@ -98,9 +102,10 @@ class ProjectModel:
         self.blocks.append(block)
 
     def remove_block(self, uid: str) -> None:
-        self.blocks = [b for b in self.blocks if b.uid != uid]
+        # списки меняются на месте: ссылки на них остаются действительными
+        self.blocks[:] = [b for b in self.blocks if b.uid != uid]
         # связанные соединения тоже удалим — безопасность на уровне модели
-        self.connections = [
+        self.connections[:] = [
             c for c in self.connections if (c.from_block_uid != uid and c.to_block_uid != uid)
         ]
 
@@ -108,7 +113,7 @@ class ProjectModel:
         self.connections.append(connection)
 
     def remove_connection(self, connection: ConnectionModel) -> None:
-        self.connections = [c for c in self.connections if not c.matches(connection)]
+        self.connections[:] = [c for c in self.connections if not c.matches(connection)]
 
     def find_connections_of(self, uid: str) -> List[ConnectionModel]:
         return [c for c in self.connections if c.from_block_uid == uid or c.to_block_uid == uid]
@@ -1,6 +1,8 @@
 # app/ui/main_window.py
 from __future__ import annotations
 
+import logging
+from concurrent.futures import Future
 from pathlib import Path
 from typing import Callable, Dict, List, Optional, Union
 
@@ -32,20 +34,23 @@ from .props.props_dock import PropsDock
 from .widgets.canvas_view import CanvasView
 from .widgets.serial_monitor import SerialMonitorDock
 
+log = logging.getLogger(__name__)
+
 
 class MainWindow(QMainWindow):
     _TEXT_INPUT_WIDGETS = (QLineEdit, QPlainTextEdit, QTextEdit)
 
-    def __init__(self) -> None:
+    def __init__(self, blocks_future: Optional[Future] = None) -> None:
+        """``blocks_future`` — загрузка каталога блоков, запущенная заранее в фоне."""
         super().__init__()
+        self._blocks_future = blocks_future
         self.setWindowTitle("Arduino RoboLab (Preview)")
         self.resize(1280, 800)
 
         # Сцена и вью
         self.canvas_scene = CanvasScene()
         self.canvas_scene.blockAdded.connect(self._on_block_added)
-        self.canvas_scene.blocksRemoved.connect(self._on_blocks_removed)
-        self.canvas_scene.connectionsRemoved.connect(self._on_connections_removed)
+        self.canvas_scene.itemsRemoved.connect(self._on_items_removed)
         self.canvas_scene.connectionAdded.connect(self._on_connection_added)
         self.canvas_scene.statusMessage.connect(self._show_status_message)
         self.canvas_scene.selectionChanged.connect(self._update_delete_action)
@@ -321,9 +326,10 @@ class MainWindow(QMainWindow):
     def _load_block_library(self) -> None:
         blocks_path = Path(__file__).resolve().parents[2] / "data" / "blocks" / "blocks.json"
         self._blocks_path = blocks_path
-        print(f"[RoboLab] Loading block palette from {blocks_path}")
+        log.debug("Loading block palette from %s", blocks_path)
+        future, self._blocks_future = self._blocks_future, None
         try:
-            normalized = load_blocks(blocks_path)
+            normalized = future.result() if future is not None else load_blocks(blocks_path)
         except BlocksLoaderError as exc:  # pragma: no cover - UI feedback path
             print(f"[RoboLab] Failed to load blocks: {exc}")
             QMessageBox.critical(
@@ -393,7 +399,7 @@ class MainWindow(QMainWindow):
 
     # ----------------------------------------------------------------- actions
     def action_new_project(self) -> None:
-        self.canvas_scene.load_model(ProjectModel())
+        self.canvas_scene.reset()
         self._current_project_path = None
         self.statusBar().showMessage("Создан новый проект", 3000)
         self._update_status_counts()
@@ -541,18 +547,14 @@ class MainWindow(QMainWindow):
         self._update_status_counts()
         self._on_selection_changed()
 
-    def _on_blocks_removed(self, count: int) -> None:
-        if count:
-            self.statusBar().showMessage(f"Удалено блоков: {count}", 3000)
+    def _on_items_removed(self, blocks: int, _connections: int) -> None:
+        # текст статуса приходит от сцены через statusMessage
+        if blocks:
             self._update_status_counts()
 
     def _on_connection_added(self, connection) -> None:
         self.statusBar().showMessage("Создано соединение", 2000)
 
-    def _on_connections_removed(self, count: int) -> None:
-        if count:
-            self.statusBar().showMessage(f"Удалено соединений: {count}", 2000)
-
     def _show_status_message(self, text: str, timeout: int = 4000) -> None:
         self.statusBar().showMessage(text, timeout)
 
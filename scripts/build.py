@@ -2,6 +2,8 @@
 from __future__ import annotations
 
 import shutil
+import subprocess
+import sys
 from pathlib import Path
 
 
@@ -11,6 +13,11 @@ ASSETS = [
     ("portable/Tools", "portable/Tools"),
 ]
 
+# Модули с горячими циклами обхода AST, которые можно собрать mypyc
+NATIVE_MODULES = [
+    "app/core/ast/ast_nodes.py",
+]
+
 
 def copy_tree(src: Path, dst: Path) -> None:
     if dst.exists():
@@ -34,8 +41,30 @@ def build_portable(root: Path, output_dir: Path) -> None:
             shutil.copy2(src_path, dst_path)
 
 
+def compile_native(portable_root: Path) -> bool:
+    """Собрать NATIVE_MODULES через mypyc рядом с исходниками (если mypyc установлен).
+
+    Расширения (.so/.pyd) импортируются раньше одноимённых .py, поэтому
+    исходники остаются в сборке как запасной вариант.
+    """
+
+    try:
+        import mypyc  # noqa: F401
+    except ImportError:
+        print("mypyc не установлен, нативная сборка пропущена")
+        return False
+    result = subprocess.run([sys.executable, "-m", "mypyc", *NATIVE_MODULES], cwd=portable_root)
+    shutil.rmtree(portable_root / "build", ignore_errors=True)
+    if result.returncode != 0:
+        print("mypyc завершился с ошибкой, используется чистый Python")
+        return False
+    return True
+
+
 if __name__ == "__main__":
     repo_root = Path(__file__).resolve().parents[1]
     dist_dir = repo_root / "dist" / "portable"
     build_portable(repo_root, dist_dir)
+    if "--mypyc" in sys.argv[1:]:
+        compile_native(dist_dir / "ArduinoRoboLab")
     print(f"Portable сборка создана в {dist_dir}")
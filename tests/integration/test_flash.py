@@ -54,3 +54,14 @@ def test_flash_command_and_error_parsing(tmp_path: Path) -> None:
     assert len(errors) == 1
     assert errors[0].line == 12
     assert "foo" in errors[0].message
+
+
+def test_error_parsing_windows_paths() -> None:
+    errors = parse_compile_errors(
+        "C:\\Users\\robo\\sketch\\sketch.ino:7:3: error: expected ';' before '}' token\n"
+        "In file included from C:\\Users\\robo\\sketch\\sketch.ino:1:\n"
+    )
+    assert len(errors) == 1
+    assert errors[0].file == "C:\\Users\\robo\\sketch\\sketch.ino"
+    assert (errors[0].line, errors[0].column) == (7, 3)
+    assert errors[0].message == "error: expected ';' before '}' token"
@@ -0,0 +1,79 @@
+"""Юнит-тесты модели AST."""
+from pathlib import Path
+
+import pytest
+
+from app.core.ast.ast_nodes import BlockInstance, BlockRegistry, BoardProfiles, ProgramNode
+from app.core.blocks_loader import BlocksLoaderError
+
+DATA_PATH = Path(__file__).resolve().parents[2] / "data" / "blocks" / "blocks.json"
+
+
+def _program() -> ProgramNode:
+    start = BlockInstance(
+        "start",
+        "EV_START",
+        children={
+            "setup": [BlockInstance("a", "X")],
+            "loop": [
+                BlockInstance("b", "Y", children={"then": [BlockInstance("c", "Z")]}),
+                BlockInstance("d", "X"),
+            ],
+        },
+    )
+    return ProgramNode(board_id="uno", root=start)
+
+
+def test_iter_blocks_preorder() -> None:
+    program = _program()
+    assert [block.instance_id for block in program.iter_blocks()] == ["start", "a", "b", "c", "d"]
+
+
+def test_iter_blocks_sees_tree_changes() -> None:
+    program = _program()
+    list(program.iter_blocks())
+    program.root.children["loop"].append(BlockInstance("e", "X"))
+    assert [block.instance_id for block in program.iter_blocks()][-1] == "e"
+
+    program.root = BlockInstance("other", "EV_START")
+    assert [block.instance_id for block in program.iter_blocks()] == ["other"]
+
+
+@pytest.mark.parametrize(
+    "block",
+    [
+        {"id": "bad", "category": "x", "kind": "weird"},
+        {"id": "bad", "name": "B", "category": "x", "kind": "statement", "parameters": [{"name": "p"}]},
+        {"id": "bad", "name": "B", "category": "x", "kind": "statement", "containers": [{"name": "c", "section": "nope"}]},
+    ],
+)
+def test_lazy_registry_rejects_malformed_block_on_load(block: dict) -> None:
+    with pytest.raises(BlocksLoaderError):
+        BlockRegistry.from_mapping_lazy({"blocks": [block]})
+
+
+def test_lazy_registry_rejects_unknown_section_on_load() -> None:
+    block = {"id": "bad", "name": "B", "category": "x", "kind": "statement", "section": "nope"}
+    with pytest.raises(ValueError):
+        BlockRegistry.from_mapping_lazy({"blocks": [block]})
+
+
+def test_load_from_file_builds_definitions_on_demand() -> None:
+    registry = BlockRegistry.load_from_file(DATA_PATH)
+    assert "EV_START" in registry
+    assert registry.get("EV_START").block_id == "EV_START"
+    with pytest.raises(KeyError):
+        registry.get("NO_SUCH_BLOCK")
+
+
+def test_board_profile_accepts_wide_pin_numbers() -> None:
+    profiles = BoardProfiles({"big": {"id": "big", "pins": {"digital": [0, 300], "pwm": [-1]}}})
+    pins = profiles["big"].pins
+    assert list(pins.digital) == [0, 300]
+    assert list(pins.pwm) == [-1]
+
+
+def test_board_profile_rejects_out_of_range_pin() -> None:
+    profiles = BoardProfiles({"bad": {"id": "bad", "pins": {"digital": [1 << 20]}}})
+    with pytest.raises(BlocksLoaderError, match="bad"):
+        profiles["bad"]
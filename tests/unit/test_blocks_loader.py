@@ -0,0 +1,28 @@
+"""Проверка кэширования загрузчика каталога блоков."""
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+from app.core.blocks_loader import load_blocks
+
+
+def _write_catalog(path: Path, title: str) -> None:
+    path.write_text(json.dumps([{"id": "B1", "category": "logic", "title": title}]), encoding="utf-8")
+
+
+def test_load_blocks_reuses_result_until_file_changes(tmp_path: Path) -> None:
+    catalog = tmp_path / "blocks.json"
+    _write_catalog(catalog, "Первый")
+
+    first = load_blocks(catalog)
+    assert load_blocks(catalog) is first
+
+    _write_catalog(catalog, "Второй блок")
+    stat = catalog.stat()
+    os.utime(catalog, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    second = load_blocks(catalog)
+    assert second is not first
+    assert second.blocks[0].title == "Второй блок"
@@ -0,0 +1,85 @@
+# tests/unit/test_canvas_connections.py
+import pytest
+
+try:  # pragma: no cover - skip when Qt bindings are unavailable
+    from PySide6.QtCore import QPointF
+    from PySide6.QtWidgets import QApplication
+except ImportError as exc:  # pragma: no cover - import guard
+    pytest.skip(f"PySide6 runtime is not available: {exc}", allow_module_level=True)
+
+from app.ui.canvas.canvas_scene import CanvasScene
+
+
+@pytest.fixture(scope="module")
+def qt_app() -> QApplication:
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture()
+def scene(qt_app: QApplication) -> CanvasScene:
+    scene = CanvasScene()
+    scene.set_block_catalog(
+        {
+            "io": {
+                "title": "IO",
+                "inputs": [{"name": "in", "type": "flow"}],
+                "outputs": [{"name": "out", "type": "flow"}],
+                "default_params": {},
+            }
+        }
+    )
+    yield scene
+    scene.clear()
+
+
+def _connect(scene: CanvasScene, source, target) -> None:
+    scene.begin_connection(source.get_port("out", "out"))
+    scene.complete_connection(target.get_port("in", "in"))
+
+
+def test_cycle_rejected_until_path_removed(scene: CanvasScene) -> None:
+    a = scene.add_block_at("io", QPointF(0, 0))
+    b = scene.add_block_at("io", QPointF(200, 0))
+    c = scene.add_block_at("io", QPointF(400, 0))
+    _connect(scene, a, b)
+    _connect(scene, b, c)
+
+    _connect(scene, c, a)
+    assert len(scene.model().connections) == 2
+
+    scene.clearSelection()
+    b.setSelected(True)
+    assert scene.delete_selected() is True
+
+    _connect(scene, c, a)
+    assert [(conn.from_block_uid, conn.to_block_uid) for conn in scene.model().connections] == [
+        (c.block.uid, a.block.uid)
+    ]
+
+
+def test_reset_drops_blocks_and_connection_indexes(scene: CanvasScene) -> None:
+    a = scene.add_block_at("io", QPointF(0, 0))
+    b = scene.add_block_at("io", QPointF(200, 0))
+    _connect(scene, a, b)
+
+    scene.reset()
+    assert scene.model().blocks == []
+    assert scene.model().connections == []
+    assert scene._connection_items == {}  # type: ignore[attr-defined]
+
+    # старые связи не должны мешать новым блокам с теми же uid
+    a = scene.add_block_at("io", QPointF(0, 0), uid=a.block.uid)
+    b = scene.add_block_at("io", QPointF(200, 0), uid=b.block.uid)
+    _connect(scene, b, a)
+    assert len(scene.model().connections) == 1
+
+
+def test_port_hit_test_follows_moved_block(scene: CanvasScene) -> None:
+    scene.add_block_at("io", QPointF(0, 0))
+    b = scene.add_block_at("io", QPointF(200, 0))
+    old_anchor = b.get_port("in", "in").connection_anchor()
+    b.setPos(1000, 600)
+
+    assert scene._port_at(old_anchor, direction="in") is None  # type: ignore[attr-defined]
+    target = b.get_port("in", "in")
+    assert scene._port_at(target.connection_anchor(), direction="in") is target  # type: ignore[attr-defined]
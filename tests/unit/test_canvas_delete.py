@@ -120,3 +120,17 @@ def test_delete_selected_updates_attached_project(scene: CanvasScene) -> None:
 
     assert block_a.block.uid not in scene._block_items
     assert scene._connection_items == {}
+
+
+def test_delete_emits_one_summary_signal(scene: CanvasScene) -> None:
+    block_a, _, _ = _prepare_blocks_with_connection(scene)
+    emitted = []
+    scene.itemsRemoved.connect(lambda blocks, connections: emitted.append(("items", blocks, connections)))
+    scene.statusMessage.connect(lambda text, _timeout: emitted.append(("status", text)))
+    scene.projectModelChanged.connect(lambda _model: emitted.append(("model",)))
+
+    scene.clearSelection()
+    block_a.setSelected(True)
+    assert scene.delete_selected() is True
+
+    assert emitted == [("items", 1, 1), ("status", "Удалено: блоков 1, соединений 1")]
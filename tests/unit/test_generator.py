@@ -3,8 +3,8 @@ from pathlib import Path
 
 import pytest
 
-from app.core.ast.ast_nodes import BlockInstance, BlockRegistry, ProgramNode, load_board_profiles
-from app.core.generator.codegen import build_sketch
+from app.core.ast.ast_nodes import BlockInstance, BlockRegistry, ProgramNode, Section, load_board_profiles
+from app.core.generator.codegen import CodeGenerator, build_sketch
 from app.core.validator.validator import ProgramValidator
 from app.core.blocks_loader import BlocksLoaderError, load_blocks
 
@@ -82,3 +82,15 @@ def test_if_block_renders_children() -> None:
 
     assert "if (digitalRead(2) == LOW)" in bundle.code
     assert "digitalWrite(12, HIGH);" in bundle.code
+
+
+def test_section_lines_is_read_only() -> None:
+    generator = CodeGenerator(_load_registry(), _load_board())
+    generator.build(ProgramNode(board_id="uno", root=BlockInstance("start", "EV_START")))
+
+    lines = generator.section_lines
+    assert lines[Section.INCLUDES][0] == ("#include <Arduino.h>", None)
+    with pytest.raises(AttributeError):
+        lines[Section.LOOP].append(("x();", None))
+    with pytest.raises(TypeError):
+        lines[Section.LOOP] = ()
@@ -0,0 +1,67 @@
+"""Одинаковое поведение app.core.jsonio с orjson и без него."""
+from __future__ import annotations
+
+import io
+import json
+
+import pytest
+
+from app.core import jsonio
+
+
+@pytest.fixture(params=["orjson", "json"])
+def backend(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch) -> str:
+    if request.param == "orjson":
+        if not jsonio.HAS_ORJSON:
+            pytest.skip("orjson is not installed")
+    else:
+        monkeypatch.setattr(jsonio, "orjson", None)
+    return request.param
+
+
+@pytest.mark.parametrize(
+    "obj",
+    [
+        {"a": 1, "b": [1.5, None, True], "c": "тест"},
+        {"a": float("nan"), "b": [float("inf"), -float("inf")]},
+        {"big": 2**70, "neg": -(2**65)},
+        {1: "int key"},
+    ],
+)
+def test_dumps_matches_stdlib(backend: str, obj: object) -> None:
+    for indent in (False, True):
+        expected = json.dumps(obj, ensure_ascii=False, indent=2 if indent else None)
+        # repr, а не ==: NaN не равен сам себе
+        assert repr(json.loads(jsonio.dumps(obj, indent=indent))) == repr(json.loads(expected))
+
+
+def test_dumps_rejects_unsupported_types(backend: str) -> None:
+    with pytest.raises(TypeError):
+        jsonio.dumps({"a": {1, 2}})
+
+
+def test_dump_writes_same_bytes_as_dumps(backend: str) -> None:
+    obj = {"a": float("nan"), "b": 2**70}
+    buffer = io.BytesIO()
+    jsonio.dump(obj, buffer, indent=True)
+    assert buffer.getvalue() == jsonio.dumps(obj, indent=True)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b'{"a": 1, "b": [1.5, null, true], "c": "\\u0442"}',
+        b'{"big": 123456789012345678901234567890, "neg": -36893488147419103232}',
+        b'{"a": NaN, "b": [Infinity, -Infinity]}',
+    ],
+)
+def test_loads_matches_stdlib(backend: str, data: bytes) -> None:
+    expected = json.loads(data)
+    for value in (data, data.decode("utf-8"), memoryview(data)):
+        result = jsonio.loads(value)
+        assert repr(result) == repr(expected)
+
+
+def test_loads_rejects_invalid_json(backend: str) -> None:
+    with pytest.raises(ValueError):
+        jsonio.loads(b'{"a": }')
@@ -0,0 +1,110 @@
+"""Сохранение и загрузка файлов проекта .robojson."""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pytest
+
+try:  # pragma: no cover - модель проекта лежит в пакете app.ui, он импортирует Qt
+    import PySide6  # noqa: F401
+except ImportError as exc:  # pragma: no cover - import guard
+    pytest.skip(f"PySide6 runtime is not available: {exc}", allow_module_level=True)
+
+from app.core.projects import io as project_io
+from app.core.projects.io import load_project_file, save_project_file
+from app.ui.canvas.model import BlockInstance, ProjectModel
+
+
+def _model(**params: object) -> ProjectModel:
+    return ProjectModel(blocks=[BlockInstance("a", "IO_PIN_MODE", x=20.0, y=40.0, params=dict(params))])
+
+
+@pytest.fixture(params=["memory", "stream"])
+def reader(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch) -> str:
+    """Загрузка проекта целиком в памяти или потоково через ijson."""
+
+    if request.param == "stream":
+        if project_io.ijson is None:
+            pytest.skip("ijson is not installed")
+        monkeypatch.setattr(project_io, "STREAMING_THRESHOLD", 0)
+    else:
+        monkeypatch.setattr(project_io, "ijson", None)
+    return request.param
+
+
+def test_save_roundtrip(tmp_path: Path, reader: str) -> None:
+    path = tmp_path / "p.robojson"
+    save_project_file(path, _model(pin=13), board="uno", port="COM3")
+
+    model, board, port = load_project_file(path)
+    assert (board, port) == ("uno", "COM3")
+    assert [(b.uid, b.type_id, b.x, b.y, b.params) for b in model.blocks] == [
+        ("a", "IO_PIN_MODE", 20.0, 40.0, {"pin": 13})
+    ]
+
+
+def test_failed_save_keeps_previous_file(tmp_path: Path) -> None:
+    path = tmp_path / "p.robojson"
+    save_project_file(path, _model(pin=13))
+    before = path.read_bytes()
+
+    with pytest.raises(TypeError):
+        save_project_file(path, _model(pins={1, 2}))
+
+    assert path.read_bytes() == before
+    assert [entry.name for entry in tmp_path.iterdir()] == ["p.robojson"]
+
+
+def test_load_edges_and_header_values(tmp_path: Path, reader: str) -> None:
+    path = tmp_path / "p.robojson"
+    path.write_text(
+        '{"board": {"id": "uno"}, "port": null, "nodes": [1, {"uid": "a", "type": "X", "params": {"k": NaN}}],'
+        ' "edges": [{"from": {"node": "a", "port": "out"}, "to": {"node": "b", "port": "in"}}]}',
+        encoding="utf-8",
+    )
+
+    model, board, port = load_project_file(path)
+    assert (board, port) == ({"id": "uno"}, None)
+    assert [block.uid for block in model.blocks] == ["a"]
+    assert repr(model.blocks[0].params) == "{'k': nan}"
+    assert [(c.from_block_uid, c.to_block_uid) for c in model.connections] == [("a", "b")]
+
+
+def test_load_ignores_non_list_sections(tmp_path: Path, reader: str) -> None:
+    path = tmp_path / "p.robojson"
+    path.write_text('{"nodes": {"item": {"uid": "a", "type": "X"}}, "edges": 5}', encoding="utf-8")
+
+    model, board, port = load_project_file(path)
+    assert (model.blocks, model.connections, board, port) == ([], [], None, None)
+
+
+@pytest.mark.parametrize("text", ['[{"uid": "a", "type": "X"}]', '{"nodes": [', ""])
+def test_load_rejects_invalid_project(tmp_path: Path, reader: str, text: str) -> None:
+    path = tmp_path / "p.robojson"
+    path.write_text(text, encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        load_project_file(path)
+
+
+def test_save_through_symlink_keeps_link(tmp_path: Path) -> None:
+    target = tmp_path / "real.robojson"
+    save_project_file(target, _model(pin=13))
+    link = tmp_path / "link.robojson"
+    link.symlink_to(target)
+
+    save_project_file(link, _model(pin=7))
+
+    assert link.is_symlink()
+    model, _, _ = load_project_file(target)
+    assert model.blocks[0].params == {"pin": 7}
+
+
+def test_new_file_mode_follows_umask(tmp_path: Path) -> None:
+    old = os.umask(0o027)
+    try:
+        save_project_file(tmp_path / "p.robojson", _model())
+    finally:
+        os.umask(old)
+    assert (tmp_path / "p.robojson").stat().st_mode & 0o777 == 0o640
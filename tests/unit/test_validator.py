@@ -0,0 +1,62 @@
+"""Юнит-тесты валидатора программ."""
+from pathlib import Path
+
+import pytest
+
+from app.core.ast.ast_nodes import BlockInstance, BlockRegistry, ProgramNode, load_board_profiles
+from app.core.blocks_loader import BlocksLoaderError, load_blocks
+from app.core.validator.validator import ProgramValidator
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+
+
+def _validator() -> ProgramValidator:
+    normalized = load_blocks(DATA_DIR / "blocks" / "blocks.json")
+    try:
+        payload = normalized.require_registry_payload()
+    except BlocksLoaderError as exc:
+        pytest.skip(f"Пропуск тестов валидатора: {exc}")
+    board = load_board_profiles(DATA_DIR / "boards.json")["uno"]
+    return ProgramValidator(BlockRegistry.from_mapping(payload), board)
+
+
+def test_errors_follow_program_order() -> None:
+    start = BlockInstance(
+        "start",
+        "EV_START",
+        children={
+            "setup": [BlockInstance("s1", "NOPE")],
+            "loop": [
+                BlockInstance(
+                    "if1",
+                    "CTL_IF",
+                    values={"condition": "true"},
+                    children={"then": [BlockInstance("inner", "NOPE")]},
+                ),
+                BlockInstance("tail", "NOPE"),
+            ],
+        },
+    )
+    errors = _validator().validate(ProgramNode(board_id="uno", root=start))
+    assert [error.block_id for error in errors if error.block_id] == ["s1", "inner", "tail"]
+
+
+def test_deep_nesting_does_not_recurse() -> None:
+    innermost = BlockInstance("delay", "TM_DELAY", values={"ms": 10})
+    node = innermost
+    for index in range(3000):
+        node = BlockInstance(f"if{index}", "CTL_IF", values={"condition": "true"}, children={"then": [node]})
+    setup = [BlockInstance("led", "LS_LED_ON", values={"pin": 13})]
+    start = BlockInstance("start", "EV_START", children={"setup": setup, "loop": [node]})
+    assert _validator().validate(ProgramNode(board_id="uno", root=start)) == []
+
+
+def test_max_errors_stops_walk() -> None:
+    loop = [BlockInstance(f"bad{index}", "NOPE") for index in range(10)]
+    start = BlockInstance("start", "EV_START", children={"setup": [], "loop": loop})
+    program = ProgramNode(board_id="uno", root=start)
+    validator = _validator()
+
+    errors = validator.validate(program, max_errors=2)
+    assert [error.block_id for error in errors] == ["bad0", "bad1"]
+    assert len(validator.validate(program)) > 10